@@ -0,0 +1,343 @@
+"""
+Mergeable sales aggregates.
+
+The report analysis only needs a handful of sums, the best/worst rows and a
+few grouped breakdowns, so it can be computed from small partial aggregates
+instead of the full ``sales`` table. Partials are keyed by
+``(date, product_category, region)`` and extreme rows are kept per
+``(product_category, region)`` cell, which lets partials computed in SQL,
+from DataFrame chunks or from persisted state be merged and sliced freely.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+
+try:
+    from .customer_analysis import customer_analysis_to_dict
+except ImportError:  # executed as a script from src/
+    from customer_analysis import customer_analysis_to_dict
+
+SALES_COLUMNS = ['date', 'sales_amount', 'orders', 'customers', 'product_category', 'region']
+PARTIAL_KEYS = ['date', 'product_category', 'region']
+SEGMENT_KEYS = ['product_category', 'region']
+MEASURES = ['sales_amount', 'orders', 'customers']
+EXTREME_COLUMNS = ['kind'] + SALES_COLUMNS
+
+SALES_INDEXES = {
+    'idx_sales_date': 'date',
+    # Lets the best/worst row of each segment cell be found with one seek
+    'idx_sales_segment': 'product_category, region, sales_amount',
+}
+
+
+def ensure_sales_indexes(conn):
+    """Create the indexes used by the SQL aggregation queries.
+
+    Returns False when the connection cannot write (e.g. a read-only
+    connection), in which case queries still run, only slower.
+    """
+    try:
+        for name, column in SALES_INDEXES.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON sales ({column})')
+        conn.commit()
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def build_where(start_date=None, end_date=None, segment=None):
+    """Build a SQL WHERE clause and parameters for a date range and segment."""
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append('date >= ?')
+        params.append(str(start_date))
+    if end_date is not None:
+        clauses.append('date <= ?')
+        params.append(str(end_date))
+    for column, value in (segment or {}).items():
+        if column not in SEGMENT_KEYS:
+            raise ValueError(f"Unknown segment column: {column}")
+        clauses.append(f'{column} = ?')
+        params.append(value)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    return where, params
+
+
+class SalesAggregate:
+    """Partial sales aggregates that can be merged and turned into an analysis."""
+
+    def __init__(self, partials=None, extremes=None):
+        import pandas as pd
+        if partials is None:
+            partials = pd.DataFrame(columns=PARTIAL_KEYS + ['rows'] + MEASURES)
+        if extremes is None:
+            extremes = pd.DataFrame(columns=EXTREME_COLUMNS)
+        self.partials = partials
+        self.extremes = extremes
+
+    @property
+    def row_count(self):
+        return int(self.partials['rows'].sum())
+
+    @property
+    def empty(self):
+        return self.row_count == 0
+
+    @classmethod
+    def from_frame(cls, df):
+        """Aggregate a DataFrame holding raw ``sales`` rows."""
+        import pandas as pd
+        df = df[SALES_COLUMNS]
+        if df.empty:
+            return cls()
+        if not pd.api.types.is_string_dtype(df['date']):
+            df = df.assign(date=pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d'))
+        grouped = df.groupby(PARTIAL_KEYS, sort=False, observed=True)
+        partials = grouped[MEASURES].sum()
+        partials.insert(0, 'rows', grouped.size())
+        partials = partials.reset_index()
+
+        cells = df.groupby(SEGMENT_KEYS, sort=False, observed=True)['sales_amount']
+        extremes = pd.concat([
+            df.loc[cells.idxmax()].assign(kind='best'),
+            df.loc[cells.idxmin()].assign(kind='worst'),
+        ], ignore_index=True)
+        return cls(partials, extremes[EXTREME_COLUMNS])
+
+    @classmethod
+    def from_sql(cls, conn, where='', params=()):
+        """Aggregate the ``sales`` table inside SQLite.
+
+        Only the grouped partials and one best/worst row per segment cell
+        are transferred; the raw rows never leave the database. With the
+        indexes from ``ensure_sales_indexes`` each extreme row is one seek.
+        """
+        import pandas as pd
+        partials = pd.read_sql_query(
+            f"""
+            SELECT date, product_category, region, COUNT(*) AS rows,
+                   TOTAL(sales_amount) AS sales_amount,
+                   SUM(orders) AS orders, SUM(customers) AS customers
+            FROM sales{where}
+            GROUP BY date, product_category, region
+            """,
+            conn, params=list(params)
+        )
+        if partials.empty:
+            return cls()
+        cell_where = f"{where} AND" if where else ' WHERE'
+        rows = []
+        for category, region in partials[SEGMENT_KEYS].drop_duplicates().itertuples(index=False):
+            for kind, order in (('best', 'DESC'), ('worst', 'ASC')):
+                row = conn.execute(
+                    f"""
+                    SELECT {', '.join(SALES_COLUMNS)} FROM sales{cell_where}
+                    product_category = ? AND region = ?
+                    ORDER BY sales_amount {order}, rowid LIMIT 1
+                    """,
+                    [*params, category, region]
+                ).fetchone()
+                rows.append((kind, *row))
+        return cls(partials, pd.DataFrame(rows, columns=EXTREME_COLUMNS))
+
+    def merge(self, other):
+        """Return a new aggregate combining this one with ``other``."""
+        return SalesAggregate.combine([self, other])
+
+    @classmethod
+    def combine(cls, aggregates):
+        """Combine any number of aggregates with a single regrouping."""
+        import pandas as pd
+        aggregates = [aggregate for aggregate in aggregates if not aggregate.empty]
+        if len(aggregates) <= 1:
+            return aggregates[0] if aggregates else cls()
+        partials = pd.concat([aggregate.partials for aggregate in aggregates], ignore_index=True)
+        partials = partials.groupby(PARTIAL_KEYS, sort=False, as_index=False)[['rows'] + MEASURES].sum()
+        extremes = pd.concat([aggregate.extremes for aggregate in aggregates], ignore_index=True)
+        return cls(partials, cls._reduce_extremes(extremes, SEGMENT_KEYS))
+
+    @staticmethod
+    def _reduce_extremes(extremes, keys):
+        """Keep one best and one worst row per ``keys`` group (first on ties)."""
+        import pandas as pd
+        best = extremes[extremes['kind'] == 'best']
+        worst = extremes[extremes['kind'] == 'worst']
+        if keys:
+            best = best.loc[best.groupby(keys, sort=False)['sales_amount'].idxmax()]
+            worst = worst.loc[worst.groupby(keys, sort=False)['sales_amount'].idxmin()]
+        else:
+            best = best.loc[[best['sales_amount'].idxmax()]]
+            worst = worst.loc[[worst['sales_amount'].idxmin()]]
+        return pd.concat([best, worst], ignore_index=True)
+
+    def filter(self, **segment):
+        """Slice the aggregate down to a segment, e.g. ``region='North'``."""
+        partials, extremes = self.partials, self.extremes
+        for column, value in segment.items():
+            if column not in SEGMENT_KEYS:
+                raise ValueError(f"Unknown segment column: {column}")
+            partials = partials[partials[column] == value]
+            extremes = extremes[extremes[column] == value]
+        return SalesAggregate(partials.reset_index(drop=True), extremes.reset_index(drop=True))
+
+    def _extreme_row(self, kind):
+        import pandas as pd
+        extremes = self._reduce_extremes(self.extremes, [])
+        row = extremes[extremes['kind'] == kind].iloc[0][SALES_COLUMNS].copy()
+        row['date'] = pd.Timestamp(row['date'])
+        return row
+
+    def daily_frame(self):
+        """Per-day totals, suitable for the daily trend charts."""
+        import pandas as pd
+        daily = self.partials.groupby('date', as_index=False)[MEASURES].sum()
+        daily['date'] = pd.to_datetime(daily['date'])
+        return daily.sort_values('date', ignore_index=True)
+
+    def to_analysis(self):
+        """Build the ``analysis`` dict produced by ``generate_sales_analysis``."""
+        import pandas as pd
+        if self.empty:
+            raise ValueError("No sales rows to analyse")
+        partials = self.partials
+        total_sales = float(partials['sales_amount'].sum())
+        total_orders = int(partials['orders'].sum())
+        months = pd.to_datetime(partials['date']).dt.month.rename('date')
+        monthly = partials.groupby(months)[MEASURES].sum()
+        monthly['orders'] = monthly['orders'].astype('int64')
+        monthly['customers'] = monthly['customers'].astype('int64')
+        return {
+            'total_sales': total_sales,
+            'total_orders': total_orders,
+            'avg_order_value': total_sales / total_orders,
+            'daily_avg_sales': total_sales / self.row_count,
+            'best_day': self._extreme_row('best'),
+            'worst_day': self._extreme_row('worst'),
+            'monthly_trends': monthly,
+            'category_performance': partials.groupby('product_category')['sales_amount'].sum().sort_values(ascending=False),
+            'regional_performance': partials.groupby('region')['sales_amount'].sum().sort_values(ascending=False),
+        }
+
+
+class AggregateStateStore:
+    """Persist ``SalesAggregate`` partials in SQLite, keyed by a date watermark.
+
+    Each source keeps its per-day/category/region partials, its best/worst
+    rows per segment cell and the latest date folded in. Updates only rewrite
+    the partials from the watermark day onwards.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS sales_aggregate_state (
+                    source TEXT, date TEXT, product_category TEXT, region TEXT,
+                    rows INTEGER, sales_amount REAL, orders INTEGER, customers INTEGER,
+                    PRIMARY KEY (source, date, product_category, region)
+                );
+                CREATE TABLE IF NOT EXISTS sales_aggregate_extremes (
+                    source TEXT, kind TEXT, date TEXT, sales_amount REAL,
+                    orders INTEGER, customers INTEGER, product_category TEXT, region TEXT
+                );
+                CREATE TABLE IF NOT EXISTS sales_aggregate_watermark (
+                    source TEXT PRIMARY KEY, watermark TEXT, updated_at TEXT
+                );
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, source):
+        """Return ``(aggregate, watermark)``; the watermark is None when empty."""
+        import pandas as pd
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT watermark FROM sales_aggregate_watermark WHERE source = ?', (source,)
+            ).fetchone()
+            if row is None:
+                return SalesAggregate(), None
+            partials = pd.read_sql_query(
+                f"SELECT {', '.join(PARTIAL_KEYS + ['rows'] + MEASURES)} "
+                "FROM sales_aggregate_state WHERE source = ?",
+                conn, params=[source]
+            )
+            extremes = pd.read_sql_query(
+                f"SELECT {', '.join(EXTREME_COLUMNS)} FROM sales_aggregate_extremes WHERE source = ?",
+                conn, params=[source]
+            )
+        return SalesAggregate(partials, extremes), row[0]
+
+    def save(self, source, aggregate, delta, since=None):
+        """Store ``delta`` partials from ``since`` onwards and the merged extremes.
+
+        ``aggregate`` is the merged state after folding ``delta`` in. When
+        ``since`` is None the stored state is replaced entirely.
+        """
+        watermark = aggregate.partials['date'].max() if not aggregate.empty else None
+        with self._connect() as conn:
+            if since is None:
+                conn.execute('DELETE FROM sales_aggregate_state WHERE source = ?', (source,))
+            else:
+                conn.execute(
+                    'DELETE FROM sales_aggregate_state WHERE source = ? AND date >= ?', (source, since)
+                )
+            conn.executemany(
+                'INSERT INTO sales_aggregate_state VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                ((source, *row) for row in delta.partials[PARTIAL_KEYS + ['rows'] + MEASURES].itertuples(index=False))
+            )
+            conn.execute('DELETE FROM sales_aggregate_extremes WHERE source = ?', (source,))
+            conn.executemany(
+                'INSERT INTO sales_aggregate_extremes VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                ((source, *row) for row in aggregate.extremes[EXTREME_COLUMNS].itertuples(index=False))
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sales_aggregate_watermark VALUES (?, ?, datetime('now'))",
+                (source, watermark)
+            )
+        return watermark
+
+
+def analysis_to_dict(analysis):
+    """Convert an ``analysis`` dict into plain JSON-serialisable values."""
+    import pandas as pd
+    def row(series):
+        return {
+            'date': pd.Timestamp(series['date']).strftime('%Y-%m-%d'),
+            'sales_amount': float(series['sales_amount']),
+            'orders': int(series['orders']),
+            'customers': int(series['customers']),
+            'product_category': series['product_category'],
+            'region': series['region'],
+        }
+
+    monthly = analysis['monthly_trends']
+    return {
+        'total_sales': float(analysis['total_sales']),
+        'total_orders': int(analysis['total_orders']),
+        'avg_order_value': float(analysis['avg_order_value']),
+        'daily_avg_sales': float(analysis['daily_avg_sales']),
+        'best_day': row(analysis['best_day']),
+        'worst_day': row(analysis['worst_day']),
+        'monthly_trends': [
+            {
+                'month': int(month),
+                'sales_amount': float(values['sales_amount']),
+                'orders': int(values['orders']),
+                'customers': int(values['customers']),
+            }
+            for month, values in monthly.iterrows()
+        ],
+        'category_performance': {k: float(v) for k, v in analysis['category_performance'].items()},
+        'regional_performance': {k: float(v) for k, v in analysis['regional_performance'].items()},
+        **({'customer_analysis': customer_analysis_to_dict(analysis['customer_analysis'])}
+           if analysis.get('customer_analysis') else {}),
+    }
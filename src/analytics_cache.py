@@ -0,0 +1,103 @@
+"""
+In-process cache for the analytics API.
+
+``AnalyticsCache`` keeps the JSON payloads of recent analytics queries in an
+LRU map whose entries expire after a TTL. Every entry carries an ETag derived
+from its payload so pollers can revalidate with ``If-None-Match``. Ingesting
+new data calls ``invalidate``, which bumps a version counter that is part of
+every cache key, so stale entries are never served again.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def payload_etag(payload):
+    """Strong ETag for a JSON-serialisable payload."""
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()[:32]
+
+
+class AnalyticsCache:
+    """Thread-safe LRU cache of ``(etag, payload)`` entries with a TTL in seconds."""
+
+    def __init__(self, max_entries=128, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._counters = {'hits': 0, 'misses': 0}
+
+    def _key(self, params):
+        return (self.version, tuple(sorted(params.items())))
+
+    def _lookup(self, params):
+        key = self._key(params)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1:]
+
+    def get(self, params):
+        """Return the cached ``(etag, payload)`` for ``params``, or None."""
+        with self._lock:
+            entry = self._lookup(params)
+            self._counters['hits' if entry is not None else 'misses'] += 1
+            return entry
+
+    def put(self, params, payload, version=None):
+        """Store ``payload`` and return its ``(etag, payload)`` entry.
+
+        ``version`` is the cache version the payload was computed under; a
+        payload computed before an ``invalidate`` is returned but not stored.
+        """
+        entry = (payload_etag(payload), payload)
+        with self._lock:
+            if version is not None and version != self.version:
+                return entry
+            key = self._key(params)
+            self._entries[key] = (time.monotonic() + self.ttl, *entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_compute(self, params, compute):
+        """Return the cached entry for ``params``, calling ``compute()`` on a miss.
+
+        Concurrent misses for the same parameters wait for a single
+        computation instead of each running the query.
+        """
+        entry = self.get(params)
+        if entry is not None:
+            return entry
+        with self._lock:
+            key = self._key(params)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+            version = self.version
+        with key_lock:
+            with self._lock:
+                entry = self._lookup(params)
+            if entry is None:
+                entry = self.put(params, compute(), version=version)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return entry
+
+    def invalidate(self):
+        """Drop every entry, e.g. after new rows were ingested."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def metrics(self):
+        """Hit/miss counters and the current entry count."""
+        with self._lock:
+            return {**self._counters, 'entries': len(self._entries), 'version': self.version}
@@ -1,7 +1,79 @@
 
-from flask import Flask, render_template_string, request, jsonify
+import os
+from datetime import datetime
+from pathlib import Path
+
+from flask import Flask, render_template_string, request, jsonify, send_file
+
+try:
+    from .aggregation import analysis_to_dict
+    from .analytics_cache import AnalyticsCache
+    from .data_sources import UPLOAD_FORMATS
+    from .instrumentation import REGISTRY, StageRecorder
+    from .jobs import JobManager, JobQueueFull
+    from .report_generator import ReportGenerator
+except ImportError:  # executed as a script: python src/app.py
+    from aggregation import analysis_to_dict
+    from analytics_cache import AnalyticsCache
+    from data_sources import UPLOAD_FORMATS
+    from instrumentation import REGISTRY, StageRecorder
+    from jobs import JobManager, JobQueueFull
+    from report_generator import ReportGenerator
 
 app = Flask(__name__)
+app.config.update(
+    REPORT_CONFIG=os.environ.get('REPORT_CONFIG', 'config.json'),
+    REPORT_WORKERS=int(os.environ.get('REPORT_WORKERS', os.cpu_count() or 1)),
+    REPORT_MAX_PENDING=int(os.environ.get('REPORT_MAX_PENDING', 8)),
+    UPLOAD_CHUNK_ROWS=int(os.environ.get('UPLOAD_CHUNK_ROWS', 50_000)),
+    ANALYTICS_TTL=float(os.environ.get('ANALYTICS_TTL', 30)),
+    ANALYTICS_CACHE_SIZE=int(os.environ.get('ANALYTICS_CACHE_SIZE', 128)),
+)
+
+ANALYTICS_FILTERS = ('start_date', 'end_date', 'region', 'product_category')
+
+_job_manager = None
+_report_generator = None
+_analytics_cache = None
+
+def get_job_manager():
+    """Return the report job manager, created on first use."""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(
+            config_file=app.config['REPORT_CONFIG'],
+            max_workers=app.config['REPORT_WORKERS'],
+            max_pending=app.config['REPORT_MAX_PENDING']
+        )
+    return _job_manager
+
+def get_report_generator():
+    """Return the in-process report generator used for uploads, created on first use."""
+    global _report_generator
+    if _report_generator is None:
+        _report_generator = ReportGenerator(app.config['REPORT_CONFIG'])
+    return _report_generator
+
+def get_analytics_cache():
+    """Return the analytics response cache, created on first use."""
+    global _analytics_cache
+    if _analytics_cache is None:
+        _analytics_cache = AnalyticsCache(
+            max_entries=app.config['ANALYTICS_CACHE_SIZE'],
+            ttl=app.config['ANALYTICS_TTL']
+        )
+    return _analytics_cache
+
+def compute_analytics(filters):
+    """Run the filtered sales analysis on a pooled connection and return it as JSON-ready data."""
+    generator = get_report_generator()
+    segment = {key: filters[key] for key in ('region', 'product_category') if key in filters}
+    with StageRecorder('api').stage('analytics_query'):
+        with generator.get_data_source().connection() as conn:
+            analysis = generator.filtered_sales_analysis(
+                conn, filters.get('start_date'), filters.get('end_date'), segment
+            )
+    return {'filters': filters, **analysis_to_dict(analysis)}
 
 DASHBOARD_HTML = """
 <!DOCTYPE html>
@@ -12,9 +84,13 @@ DASHBOARD_HTML = """
 <p>Use the API endpoints below:</p>
 <ul>
   <li><code>POST /api/process</code> — Process data</li>
-  <li><code>GET /api/analytics</code> — Get analytics</li>
-  <li><code>POST /api/upload</code> — Upload file</li>
+  <li><code>GET /api/analytics</code> — Sales KPIs (filters: start_date, end_date, region, product_category)</li>
+  <li><code>POST /api/upload</code> — Upload sales rows (CSV or Parquet)</li>
   <li><code>GET /api/status</code> — System status</li>
+  <li><code>GET /api/metrics</code> — Pipeline stage metrics (Prometheus text format)</li>
+  <li><code>POST /api/reports</code> — Queue a report job</li>
+  <li><code>GET /api/reports/&lt;job_id&gt;</code> — Job status</li>
+  <li><code>GET /api/reports/&lt;job_id&gt;/artifacts/&lt;name&gt;</code> — Download an artifact</li>
 </ul>
 </body>
 </html>
@@ -31,22 +107,99 @@ def process_data():
 
 @app.route('/api/analytics', methods=['GET'])
 def get_analytics():
-    return jsonify({'status': 'success', 'analytics_results': 'Sample analytics data'})
+    filters = {key: request.args[key] for key in ANALYTICS_FILTERS if request.args.get(key)}
+    for key in ('start_date', 'end_date'):
+        if key in filters:
+            try:
+                filters[key] = datetime.strptime(filters[key], '%Y-%m-%d').strftime('%Y-%m-%d')
+            except ValueError:
+                return jsonify({'status': 'error', 'message': f'{key} must be YYYY-MM-DD'}), 400
+    try:
+        etag, payload = get_analytics_cache().get_or_compute(filters, lambda: compute_analytics(filters))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify({'status': 'success', 'analytics_results': payload})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"private, max-age={int(app.config['ANALYTICS_TTL'])}"
+    return response
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
-        return jsonify({'status': 'error', 'message': 'No file part'})
+        return jsonify({'status': 'error', 'message': 'No file part'}), 400
     file = request.files['file']
     if file.filename == '':
-        return jsonify({'status': 'error', 'message': 'No selected file'})
-    if file:
-        return jsonify({'status': 'success', 'message': f'File {file.filename} uploaded successfully'})
-    return jsonify({'status': 'error', 'message': 'File upload failed'})
+        return jsonify({'status': 'error', 'message': 'No selected file'}), 400
+    file_format = request.form.get('format') or UPLOAD_FORMATS.get(Path(file.filename).suffix.lower())
+    if file_format not in UPLOAD_FORMATS.values():
+        return jsonify({'status': 'error', 'message': f'Unsupported file type: {file.filename}'}), 400
+    try:
+        with StageRecorder('api').stage('ingest') as record:
+            stats = get_report_generator().ingest_sales_file(
+                file.stream, file_format, chunksize=app.config['UPLOAD_CHUNK_ROWS']
+            )
+            record['rows'] = stats['rows']
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    get_analytics_cache().invalidate()
+    return jsonify({'status': 'success', 'message': f"Ingested {stats['rows']} rows from {file.filename}",
+                    **stats})
+
+@app.route('/api/reports', methods=['POST'])
+def submit_report():
+    body = request.get_json(silent=True) or {}
+    job_type = body.get('type', 'full')
+    params = {key: body[key] for key in ('templates', 'specs') if key in body}
+    try:
+        job_id = get_job_manager().submit(job_type, params)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except JobQueueFull as e:
+        response = jsonify({'status': 'error', 'message': str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    return jsonify({'status': 'queued', 'job_id': job_id,
+                    'status_url': f'/api/reports/{job_id}'}), 202
+
+@app.route('/api/reports/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    return jsonify(job)
+
+@app.route('/api/reports/<job_id>/artifacts/<path:name>', methods=['GET'])
+def download_report_artifact(job_id, name):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    if job['status'] != 'succeeded':
+        return jsonify({'status': 'error', 'message': f"Job is {job['status']}"}), 409
+    if name not in job['artifacts']:
+        return jsonify({'status': 'error', 'message': 'Unknown artifact'}), 404
+    path = os.path.abspath(job['artifacts'][name])
+    if not os.path.exists(path):
+        return jsonify({'status': 'error', 'message': 'Artifact is no longer available'}), 410
+    return send_file(path)
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    return jsonify({'status': 'success', 'system_status': 'Operational'})
+    return jsonify({'status': 'success', 'system_status': 'Operational',
+                    'pending_jobs': get_job_manager().pending()})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    cache = get_analytics_cache().metrics()
+    text = REGISTRY.render_prometheus({
+        'report_jobs_pending': ('Queued or running report jobs.', get_job_manager().pending()),
+        'analytics_cache_hits': ('Analytics cache hits since start.', cache['hits']),
+        'analytics_cache_misses': ('Analytics cache misses since start.', cache['misses']),
+        'analytics_cache_entries': ('Entries in the analytics cache.', cache['entries']),
+    })
+    return app.response_class(text, mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(debug=False)
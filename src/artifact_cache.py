@@ -0,0 +1,120 @@
+"""
+Content-addressed cache for rendered reports.
+
+Entries are keyed by a fingerprint of the source data, the report settings
+and the code version. Each entry directory holds the rendered artifacts, the
+pickled analysis dict and a manifest whose mtime records the last access,
+which drives LRU eviction under an entry-count and a total-size budget.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from functools import lru_cache
+from pathlib import Path
+
+MANIFEST = 'manifest.json'
+ANALYSIS = 'analysis.pkl'
+
+
+@lru_cache(maxsize=1)
+def code_version():
+    """Hash of the package sources, so code changes invalidate cached reports."""
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def cache_key(*parts):
+    """Stable hex key for JSON-serialisable ``parts``."""
+    payload = json.dumps([*parts, code_version()], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ArtifactCache:
+    """On-disk LRU cache of report artifacts and analyses."""
+
+    def __init__(self, root, max_entries=32, max_bytes=512 * 1024 * 1024):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def get(self, key):
+        """Return ``{'artifacts': {...}, 'analysis': ...}`` or None on a miss."""
+        entry = self.root / key
+        manifest_path = entry / MANIFEST
+        try:
+            manifest = json.loads(manifest_path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        artifacts = {name: str(entry / filename) for name, filename in manifest['artifacts'].items()}
+        if not all(os.path.exists(path) for path in artifacts.values()):
+            return None
+        with open(entry / ANALYSIS, 'rb') as f:
+            analysis = pickle.load(f)
+        # Mark as recently used
+        os.utime(manifest_path)
+        return {'artifacts': artifacts, 'analysis': analysis}
+
+    def put(self, key, artifacts, analysis, assets=()):
+        """Store ``artifacts`` (name -> path) and ``analysis`` under ``key``.
+
+        ``assets`` are extra files the artifacts need beside them (such as a
+        shared plotly.js bundle); they are stored but not returned. Files are
+        copied rather than hard-linked, because the renderers overwrite their
+        output files in place and a link would let the next render change the
+        entry. Returns the cached artifact paths.
+        """
+        entry = self.root / key
+        tmp = self.root / f'.{key}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        manifest = {'artifacts': {}, 'created': time.time()}
+        for name, path in artifacts.items():
+            manifest['artifacts'][name] = self._store_file(path, tmp)
+        for path in assets:
+            self._store_file(path, tmp)
+        with open(tmp / ANALYSIS, 'wb') as f:
+            pickle.dump(analysis, f)
+        (tmp / MANIFEST).write_text(json.dumps(manifest))
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+        self.evict()
+        return {name: str(entry / filename) for name, filename in manifest['artifacts'].items()}
+
+    @staticmethod
+    def _store_file(path, directory):
+        filename = Path(path).name
+        shutil.copy2(path, directory / filename)
+        return filename
+
+    def entries(self):
+        """Return ``(last_access, size, path)`` for every entry, oldest first."""
+        entries = []
+        for entry in self.root.iterdir():
+            manifest_path = entry / MANIFEST
+            if entry.name.startswith('.') or not manifest_path.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            entries.append((manifest_path.stat().st_mtime, size, entry))
+        return sorted(entries)
+
+    def evict(self):
+        """Drop least recently used entries until both budgets are met."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, entry = entries.pop(0)
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Remove every cache entry."""
+        for _, _, entry in self.entries():
+            shutil.rmtree(entry, ignore_errors=True)
@@ -0,0 +1,235 @@
+"""
+Benchmark harness for the report pipeline.
+
+Each scale seeds a fresh SQLite database with ``create_sample_data`` and times
+the pipeline stages with ``instrumentation.measure``. Results are compared
+with a stored baseline JSON; a stage counts as a regression when it is
+slower than its baseline by more than the relative threshold and by more
+than a small absolute noise floor. The long-table PDF
+mode is benchmarked separately in pages rendered per second. Run it with::
+
+    python -m src.benchmark --scales 10k 1m
+    python -m src.benchmark --scales 10m --update-baseline
+    python -m src.benchmark --scales --pdf-rows 20000
+"""
+
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+try:
+    from .instrumentation import measure
+    from .pdf_tables import build_pdf, long_table
+    from .report_generator import REGIONS, ReportGenerator, _pyplot
+except ImportError:  # executed as a script from src/
+    from instrumentation import measure
+    from pdf_tables import build_pdf, long_table
+    from report_generator import REGIONS, ReportGenerator, _pyplot
+
+STAGES = [
+    'create_sample_data',
+    'generate_sales_analysis',
+    'generate_customer_analysis',
+    'create_visualizations',
+    'create_interactive_dashboard',
+    'generate_pdf_report',
+]
+
+SCALES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent.parent / 'benchmarks' / 'baseline.json'
+
+
+def parse_scale(scale):
+    """Row count for a scale name such as ``'10k'``, ``'1m'`` or ``'250000'``."""
+    scale = str(scale).lower()
+    if scale in SCALES:
+        return SCALES[scale]
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(scale[-1:], 1)
+    try:
+        return int(float(scale.rstrip('km')) * multiplier)
+    except ValueError:
+        raise ValueError(f"Unknown benchmark scale: {scale}")
+
+
+def warm_imports():
+    """Import the lazily loaded backends so that stage timings exclude import time."""
+    import pandas
+    import plotly.graph_objects
+    import reportlab.platypus
+    _pyplot()
+
+
+def run_benchmark(n_rows, repeat=1, engine='auto', profile='screen', seed=42, workdir=None, n_customers=1000):
+    """Time every stage at ``n_rows`` rows; returns ``{stage: seconds}``.
+
+    Each stage runs ``repeat`` times and the fastest wall time is kept.
+    """
+    warm_imports()
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        tmp = Path(tmp)
+        generator = ReportGenerator(str(tmp / 'config.json'))
+        generator.config['analysis'] = {'engine': engine}
+        generator.config['cache'] = {'enabled': False}
+        timings = {stage: [] for stage in STAGES}
+        try:
+            for attempt in range(repeat):
+                db_path = tmp / f'sales_{attempt}.db'
+                conn = sqlite3.connect(db_path)
+                try:
+                    with measure('create_sample_data') as record:
+                        generator.create_sample_data(conn, n_rows=n_rows, n_customers=n_customers, seed=seed)
+                    timings['create_sample_data'].append(record['wall_seconds'])
+                    with measure('generate_sales_analysis') as record:
+                        analysis, sales_df = generator.generate_sales_analysis(conn, engine=engine)
+                    timings['generate_sales_analysis'].append(record['wall_seconds'])
+                    with measure('generate_customer_analysis') as record:
+                        analysis['customer_analysis'] = generator.generate_customer_analysis(conn)
+                    timings['generate_customer_analysis'].append(record['wall_seconds'])
+                finally:
+                    conn.close()
+                    db_path.unlink()
+                output_dir = tmp / 'reports'
+                with measure('create_visualizations') as record:
+                    chart_path = generator.create_visualizations(sales_df, analysis, output_dir, profile=profile)
+                timings['create_visualizations'].append(record['wall_seconds'])
+                with measure('create_interactive_dashboard') as record:
+                    generator.create_interactive_dashboard(sales_df, analysis, output_dir)
+                timings['create_interactive_dashboard'].append(record['wall_seconds'])
+                with measure('generate_pdf_report') as record:
+                    generator.generate_pdf_report(analysis, chart_path, output_dir)
+                timings['generate_pdf_report'].append(record['wall_seconds'])
+        finally:
+            generator.close()
+    return {stage: round(min(values), 4) for stage, values in timings.items()}
+
+
+def run_pdf_benchmark(n_rows, chunk_rows=100, seed=42, workdir=None):
+    """Render an ``n_rows`` detail table in long-table mode.
+
+    Returns the page count, wall seconds, pages per second and the
+    tracemalloc peak, which stays flat as ``n_rows`` grows. tracemalloc
+    slows the build down, so the rate comes from a second, untraced run.
+    """
+    def rows():
+        rng = random.Random(seed)
+        for index in range(n_rows):
+            yield (f'CUST_{index:07d}', rng.uniform(100, 10_000), rng.randint(1, 50), rng.choice(REGIONS))
+    
+    records = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for trace_memory in (True, False):
+            table = long_table(['Customer', 'Lifetime Value', 'Orders', 'Region'], rows(), chunk_rows=chunk_rows)
+            with measure('pdf_long_table', trace_memory) as record:
+                record['pages'] = build_pdf(Path(tmp) / 'long_table.pdf', table)
+            records.append(record)
+    traced, timed = records
+    return {
+        'rows': n_rows,
+        'pages': timed['pages'],
+        'seconds': round(timed['wall_seconds'], 4),
+        'pages_per_second': round(timed['pages'] / timed['wall_seconds'], 1),
+        'tracemalloc_peak_bytes': traced['tracemalloc_peak_bytes'],
+    }
+
+
+def compare_results(results, baseline, threshold=0.25, min_delta=0.05):
+    """List the stages of ``results`` that regressed against ``baseline``.
+
+    Both map scale names to ``{stage: seconds}``. Returns one dict per
+    regression with the scale, stage, baseline and current seconds.
+    """
+    regressions = []
+    for scale, stages in results.items():
+        for stage, seconds in stages.items():
+            expected = baseline.get(scale, {}).get(stage)
+            if expected is None:
+                continue
+            if seconds > expected * (1 + threshold) and seconds - expected > min_delta:
+                regressions.append({
+                    'scale': scale,
+                    'stage': stage,
+                    'baseline': expected,
+                    'current': seconds,
+                    'ratio': round(seconds / expected, 2) if expected else None,
+                })
+    return regressions
+
+
+def load_baseline(path):
+    """Return the ``results`` section of a baseline file, or ``{}`` if missing."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text()).get('results', {})
+
+
+def save_baseline(path, results):
+    """Merge ``results`` into the baseline file at ``path``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    merged = {**load_baseline(path), **results}
+    path.write_text(json.dumps({
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.machine(),
+        },
+        'results': merged,
+    }, indent=2, sort_keys=True) + '\n')
+
+
+def main(argv=None):
+    """Run the benchmarks and exit non-zero on regressions."""
+    parser = argparse.ArgumentParser(description="Benchmark the report pipeline")
+    parser.add_argument('--scales', nargs='*', default=['10k', '1m'], help="row counts, e.g. 10k 1m 10m")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per scale; the fastest is kept")
+    parser.add_argument('--engine', default='auto', help="analysis engine")
+    parser.add_argument('--profile', default='screen', help="chart render profile")
+    parser.add_argument('--customers', default='1000', help="customers per scale, e.g. 10m")
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="baseline JSON file")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument('--min-delta', type=float, default=0.05, help="ignore slowdowns below this many seconds")
+    parser.add_argument('--update-baseline', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    parser.add_argument('--pdf-rows', help="also benchmark a long-table PDF with this many rows, e.g. 20k")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for scale in args.scales:
+        n_rows = parse_scale(scale)
+        print(f"Benchmarking {n_rows} rows...")
+        results[scale] = run_benchmark(n_rows, repeat=args.repeat, engine=args.engine, profile=args.profile,
+                                       n_customers=parse_scale(args.customers))
+        for stage, seconds in results[scale].items():
+            print(f"  {stage}: {seconds:.3f}s")
+    if args.pdf_rows:
+        n_rows = parse_scale(args.pdf_rows)
+        print(f"Benchmarking a {n_rows}-row long-table PDF...")
+        pdf = run_pdf_benchmark(n_rows)
+        print(f"  {pdf['pages']} pages in {pdf['seconds']:.3f}s: {pdf['pages_per_second']} pages/s, "
+              f"tracemalloc peak {pdf['tracemalloc_peak_bytes'] / 2**20:.1f} MiB")
+        results[f'pdf_{args.pdf_rows}'] = {'pdf_long_table': pdf['seconds']}
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + '\n')
+    if args.update_baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    regressions = compare_results(results, load_baseline(args.baseline), args.threshold, args.min_delta)
+    for regression in regressions:
+        print(f"REGRESSION {regression['scale']} {regression['stage']}: "
+              f"{regression['baseline']:.3f}s -> {regression['current']:.3f}s ({regression['ratio']}x)")
+    if not regressions:
+        print("No regressions against the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Mergeable customer aggregates.
+
+The customer analysis (acquisition cohorts, lifetime value percentiles and
+histogram, age/gender/location breakdowns) is computed from two small
+partial aggregates instead of the ``customers`` rows:
+
+- segment partials keyed by ``(cohort, age_band, gender, location)`` with
+  the customer count and LTV total/min/max, and
+- a fine, fixed-width LTV histogram over the global LTV range.
+
+Both come out of grouped SQL queries, vectorized pandas or Arrow batches,
+merge by addition and stay the same size however many customers there are.
+Percentiles are interpolated inside the fine histogram, so they are exact
+to within ``(max - min) / FINE_BINS``.
+"""
+
+CUSTOMER_COLUMNS = ['age', 'gender', 'location', 'lifetime_value', 'acquisition_date']
+CUSTOMER_SEGMENT_KEYS = ['cohort', 'age_band', 'gender', 'location']
+BREAKDOWN_KEYS = ['age_band', 'gender', 'location']
+SEGMENT_COLUMNS = CUSTOMER_SEGMENT_KEYS + ['customers', 'ltv_total', 'ltv_min', 'ltv_max']
+
+# Lower age bounds of the bands after the first one
+AGE_EDGES = [25, 35, 45, 55, 65]
+AGE_BANDS = ['<25', '25-34', '35-44', '45-54', '55-64', '65+']
+
+LTV_PERCENTILES = [10, 25, 50, 75, 90, 95, 99]
+FINE_BINS = 10_000
+HISTOGRAM_BINS = 20
+
+
+def _age_band_sql():
+    cases = ' '.join(f"WHEN age < {edge} THEN '{band}'" for edge, band in zip(AGE_EDGES, AGE_BANDS))
+    return f"CASE {cases} ELSE '{AGE_BANDS[-1]}' END"
+
+
+def has_customers_table(conn):
+    """Whether the SQLite database behind ``conn`` has a ``customers`` table."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers'"
+    ).fetchone() is not None
+
+
+def customer_fingerprint(conn, checksum=True):
+    """Summarise the ``customers`` table for cache keys, or None without one."""
+    if not has_customers_table(conn):
+        return None
+    if checksum:
+        return list(conn.execute('SELECT COUNT(*), MAX(rowid), TOTAL(lifetime_value) FROM customers').fetchone())
+    return list(conn.execute('SELECT COUNT(*), MAX(rowid) FROM customers').fetchone())
+
+
+class CustomerAggregate:
+    """Segment partials and a fine LTV histogram that merge and turn into an analysis."""
+
+    def __init__(self, segments=None, bins=None, ltv_range=(0.0, 0.0)):
+        import numpy as np
+        import pandas as pd
+        if segments is None:
+            segments = pd.DataFrame(columns=SEGMENT_COLUMNS)
+        self.segments = segments
+        self.bins = np.zeros(FINE_BINS, dtype=np.int64) if bins is None else bins
+        self.ltv_range = (float(ltv_range[0]), float(ltv_range[1]))
+
+    @property
+    def customer_count(self):
+        return int(self.segments['customers'].sum())
+
+    @property
+    def empty(self):
+        return self.customer_count == 0
+
+    def _scale(self):
+        low, high = self.ltv_range
+        return FINE_BINS / (high - low) if high > low else 0.0
+
+    @classmethod
+    def from_frame(cls, df, ltv_range=None):
+        """Aggregate a DataFrame of raw ``customers`` rows.
+
+        ``ltv_range`` fixes the histogram range so that aggregates of
+        several chunks can be combined; it defaults to the frame's own range.
+        """
+        import numpy as np
+        import pandas as pd
+        df = df[CUSTOMER_COLUMNS]
+        if df.empty:
+            return cls(ltv_range=ltv_range or (0.0, 0.0))
+        ltv = df['lifetime_value'].to_numpy(dtype='float64')
+        if ltv_range is None:
+            ltv_range = (ltv.min(), ltv.max())
+        if pd.api.types.is_datetime64_any_dtype(df['acquisition_date']):
+            cohort = df['acquisition_date'].dt.strftime('%Y-%m')
+        else:
+            cohort = df['acquisition_date'].astype(str).str.slice(0, 7)
+        keyed = pd.DataFrame({
+            'cohort': cohort.to_numpy(),
+            'age_band': np.array(AGE_BANDS)[np.searchsorted(AGE_EDGES, df['age'].to_numpy(), side='right')],
+            'gender': df['gender'].astype(str).to_numpy(),
+            'location': df['location'].astype(str).to_numpy(),
+            'lifetime_value': ltv,
+        })
+        segments = keyed.groupby(CUSTOMER_SEGMENT_KEYS, sort=False).agg(
+            customers=('lifetime_value', 'size'),
+            ltv_total=('lifetime_value', 'sum'),
+            ltv_min=('lifetime_value', 'min'),
+            ltv_max=('lifetime_value', 'max'),
+        ).reset_index()
+        aggregate = cls(segments, ltv_range=ltv_range)
+        index = np.clip(((ltv - aggregate.ltv_range[0]) * aggregate._scale()).astype(np.int64), 0, FINE_BINS - 1)
+        aggregate.bins = np.bincount(index, minlength=FINE_BINS).astype(np.int64)
+        return aggregate
+
+    @classmethod
+    def from_sql(cls, conn):
+        """Aggregate the ``customers`` table inside SQLite.
+
+        One query finds the LTV range, one groups the segment partials and
+        one counts the fine histogram bins; no customer row is transferred.
+        """
+        import numpy as np
+        import pandas as pd
+        if not has_customers_table(conn):
+            return cls()
+        count, low, high = conn.execute(
+            'SELECT COUNT(*), MIN(lifetime_value), MAX(lifetime_value) FROM customers'
+        ).fetchone()
+        if not count:
+            return cls()
+        segments = pd.read_sql_query(
+            f"""
+            SELECT substr(acquisition_date, 1, 7) AS cohort, {_age_band_sql()} AS age_band,
+                   gender, location, COUNT(*) AS customers, TOTAL(lifetime_value) AS ltv_total,
+                   MIN(lifetime_value) AS ltv_min, MAX(lifetime_value) AS ltv_max
+            FROM customers
+            GROUP BY cohort, age_band, gender, location
+            """,
+            conn
+        )
+        aggregate = cls(segments, ltv_range=(low, high))
+        rows = conn.execute(
+            """
+            SELECT MAX(MIN(CAST((lifetime_value - ?) * ? AS INTEGER), ?), 0) AS bin, COUNT(*)
+            FROM customers GROUP BY bin
+            """,
+            (aggregate.ltv_range[0], aggregate._scale(), FINE_BINS - 1)
+        ).fetchall()
+        if rows:
+            index, counts = np.array(rows, dtype=np.int64).T
+            aggregate.bins[index] = counts
+        return aggregate
+
+    @classmethod
+    def combine(cls, aggregates):
+        """Combine aggregates computed over the same ``ltv_range``."""
+        import pandas as pd
+        aggregates = [aggregate for aggregate in aggregates if not aggregate.empty]
+        if len(aggregates) <= 1:
+            return aggregates[0] if aggregates else cls()
+        if len({aggregate.ltv_range for aggregate in aggregates}) > 1:
+            raise ValueError("Customer aggregates cover different LTV ranges")
+        segments = pd.concat([aggregate.segments for aggregate in aggregates], ignore_index=True)
+        segments = segments.groupby(CUSTOMER_SEGMENT_KEYS, sort=False, as_index=False).agg(
+            {'customers': 'sum', 'ltv_total': 'sum', 'ltv_min': 'min', 'ltv_max': 'max'}
+        )
+        return cls(segments, sum(aggregate.bins for aggregate in aggregates), aggregates[0].ltv_range)
+
+    def percentiles(self, percentiles=LTV_PERCENTILES):
+        """LTV at each percentile, interpolated inside the fine histogram."""
+        import numpy as np
+        import pandas as pd
+        low, high = self.ltv_range
+        cumulative = np.cumsum(self.bins)
+        targets = np.asarray(percentiles, dtype='float64') / 100 * cumulative[-1]
+        index = np.minimum(np.searchsorted(cumulative, targets, side='left'), FINE_BINS - 1)
+        before = np.where(index > 0, cumulative[index - 1], 0)
+        fraction = (targets - before) / np.maximum(self.bins[index], 1)
+        values = low + (index + fraction) * (high - low) / FINE_BINS
+        return pd.Series(np.clip(values, low, high), index=[f'p{p}' for p in percentiles], name='lifetime_value')
+
+    def histogram(self, bins=HISTOGRAM_BINS):
+        """Customers per equal-width LTV bin between the lowest and highest LTV."""
+        import numpy as np
+        import pandas as pd
+        low, high = self.ltv_range
+        edges = np.linspace(low, high, bins + 1)
+        return pd.DataFrame({
+            'bin_start': edges[:-1],
+            'bin_end': edges[1:],
+            'customers': self.bins.reshape(bins, -1).sum(axis=1),
+        })
+
+    def breakdown(self, key):
+        """Customers, LTV total, average LTV and customer share per ``key`` value."""
+        grouped = self.segments.groupby(key, sort=True)[['customers', 'ltv_total']].sum()
+        if key == 'age_band':
+            grouped = grouped.reindex([band for band in AGE_BANDS if band in grouped.index])
+        grouped['avg_ltv'] = grouped['ltv_total'] / grouped['customers']
+        grouped['share'] = grouped['customers'] / grouped['customers'].sum()
+        return grouped
+
+    def to_analysis(self):
+        """Build the ``customer_analysis`` dict rendered in the reports."""
+        if self.empty:
+            raise ValueError("No customer rows to analyse")
+        total_ltv = float(self.segments['ltv_total'].sum())
+        cohorts = self.breakdown('cohort')
+        cohorts['cumulative_customers'] = cohorts['customers'].cumsum()
+        return {
+            'customer_count': self.customer_count,
+            'total_ltv': total_ltv,
+            'avg_ltv': total_ltv / self.customer_count,
+            'min_ltv': float(self.segments['ltv_min'].min()),
+            'max_ltv': float(self.segments['ltv_max'].max()),
+            'ltv_percentiles': self.percentiles(),
+            'ltv_histogram': self.histogram(),
+            'cohorts': cohorts,
+            **{f'by_{key}': self.breakdown(key) for key in BREAKDOWN_KEYS},
+        }
+
+
+def customer_analysis_to_dict(analysis):
+    """Convert a ``customer_analysis`` dict into plain JSON-serialisable values."""
+    def table(frame):
+        return [
+            {frame.index.name: str(index), **{column: float(value) for column, value in row.items()}}
+            for index, row in frame.iterrows()
+        ]
+
+    return {
+        'customer_count': int(analysis['customer_count']),
+        'total_ltv': float(analysis['total_ltv']),
+        'avg_ltv': float(analysis['avg_ltv']),
+        'min_ltv': float(analysis['min_ltv']),
+        'max_ltv': float(analysis['max_ltv']),
+        'ltv_percentiles': {name: float(value) for name, value in analysis['ltv_percentiles'].items()},
+        'ltv_histogram': analysis['ltv_histogram'].astype(float).to_dict('records'),
+        **{name: table(analysis[name]) for name in ['cohorts'] + [f'by_{key}' for key in BREAKDOWN_KEYS]},
+    }
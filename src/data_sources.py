@@ -0,0 +1,327 @@
+"""
+Data sources for the report pipeline.
+
+``SQLiteDataSource`` owns a report database: it seeds or attaches to it
+explicitly, checks the table layouts, and hands out pooled connections that
+are reused across report runs. Report jobs get read-only connections while
+the database runs in WAL mode, so they never block writers.
+"""
+
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    from .aggregation import ensure_sales_indexes
+except ImportError:  # executed as a script from src/
+    from aggregation import ensure_sales_indexes
+
+SALES_SCHEMA = {
+    'date': 'TEXT',
+    'sales_amount': 'REAL',
+    'orders': 'INTEGER',
+    'customers': 'INTEGER',
+    'product_category': 'TEXT',
+    'region': 'TEXT',
+}
+
+CUSTOMERS_SCHEMA = {
+    'customer_id': 'TEXT',
+    'age': 'INTEGER',
+    'gender': 'TEXT',
+    'location': 'TEXT',
+    'lifetime_value': 'REAL',
+    'acquisition_date': 'TEXT',
+}
+
+TABLE_SCHEMAS = {
+    'sales': SALES_SCHEMA,
+    'customers': CUSTOMERS_SCHEMA,
+}
+
+REQUIRED_TABLES = ['sales']
+
+DATA_SOURCE_MODES = ('auto', 'seed', 'attach')
+
+UPLOAD_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+}
+
+
+def create_table(conn, table, replace=False):
+    """Create ``table`` with its declared layout, optionally dropping it first."""
+    columns = ', '.join(f'{name} {sql_type}' for name, sql_type in TABLE_SCHEMAS[table].items())
+    if replace:
+        conn.execute(f'DROP TABLE IF EXISTS {table}')
+    conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({columns})')
+
+
+def bulk_insert(conn, table, rows):
+    """Insert an iterable of row tuples with ``executemany``.
+
+    Returns the number of rows inserted. The caller owns the transaction.
+    """
+    columns = list(TABLE_SCHEMAS[table])
+    placeholders = ', '.join('?' for _ in columns)
+    cursor = conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+    )
+    return cursor.rowcount
+
+
+def read_sales_chunks(fileobj, file_format, chunksize=50_000):
+    """Yield DataFrames of at most ``chunksize`` rows from a CSV or Parquet file.
+
+    The file is read incrementally, so it is never held in memory as a
+    whole. Parquet support needs the optional ``pyarrow`` package.
+    """
+    import pandas as pd
+    if file_format == 'csv':
+        yield from pd.read_csv(fileobj, chunksize=chunksize, dtype={'date': str})
+    elif file_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet uploads require the pyarrow package")
+        parquet_file = pq.ParquetFile(fileobj)
+        missing = [column for column in SALES_SCHEMA if column not in parquet_file.schema_arrow.names]
+        if missing:
+            raise ValueError(f"Upload is missing columns: {', '.join(missing)}")
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=list(SALES_SCHEMA)):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported upload format: {file_format}")
+
+
+def validate_sales_chunk(df, offset=0):
+    """Check a chunk against the ``sales`` layout and return insertable row tuples.
+
+    ``offset`` is the number of rows before this chunk, used in error messages.
+    """
+    import pandas as pd
+    missing = [column for column in SALES_SCHEMA if column not in df.columns]
+    if missing:
+        raise ValueError(f"Upload is missing columns: {', '.join(missing)}")
+    df = df[list(SALES_SCHEMA)]
+    nulls = df.isna().any(axis=1)
+    if nulls.any():
+        raise ValueError(f"Row {offset + int(nulls.values.argmax()) + 1} has empty values")
+    try:
+        dates = pd.to_datetime(df['date'].astype(str), format='%Y-%m-%d')
+    except ValueError as e:
+        raise ValueError(f"Invalid date in rows {offset + 1}-{offset + len(df)}: {e}")
+    measures = {}
+    for column in ('sales_amount', 'orders', 'customers'):
+        values = pd.to_numeric(df[column], errors='coerce')
+        invalid = values.isna()
+        if column != 'sales_amount':
+            invalid |= values % 1 != 0
+        if invalid.any():
+            raise ValueError(f"Row {offset + int(invalid.values.argmax()) + 1} has an invalid {column}")
+        measures[column] = values.astype('float64' if column == 'sales_amount' else 'int64')
+    return zip(
+        dates.dt.strftime('%Y-%m-%d').tolist(),
+        measures['sales_amount'].tolist(),
+        measures['orders'].tolist(),
+        measures['customers'].tolist(),
+        df['product_category'].astype(str).tolist(),
+        df['region'].astype(str).tolist(),
+    )
+
+
+def ingest_sales(conn, chunks):
+    """Validate and insert ``chunks`` of sales rows in one transaction.
+
+    Nothing is inserted if any chunk fails validation. Returns ingestion
+    statistics including rows per second.
+    """
+    started = time.perf_counter()
+    rows = 0
+    with conn:
+        for chunk in chunks:
+            rows += bulk_insert(conn, 'sales', validate_sales_chunk(chunk, offset=rows))
+    seconds = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def detect_schema(conn):
+    """Return ``{table: [columns]}`` for the known tables present in ``conn``."""
+    schema = {}
+    for table in TABLE_SCHEMAS:
+        columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+        if columns:
+            schema[table] = columns
+    return schema
+
+
+def validate_schema(schema):
+    """Raise ValueError when a required table or a known column is missing."""
+    for table in REQUIRED_TABLES:
+        if table not in schema:
+            raise ValueError(f"Data source has no '{table}' table")
+    for table, columns in schema.items():
+        missing = [column for column in TABLE_SCHEMAS[table] if column not in columns]
+        if missing:
+            raise ValueError(f"Table '{table}' is missing columns: {', '.join(missing)}")
+
+
+class SQLiteDataSource:
+    """A SQLite report database with explicit seed/attach modes and pooled connections.
+
+    Modes:
+
+    - ``'seed'``: (re)create the tables with sample data on first use.
+    - ``'attach'``: use existing data as is; the schema must already be there.
+    - ``'auto'``: seed only when the database has no ``sales`` table yet.
+    """
+
+    def __init__(self, path, mode='auto', read_only=True, pool_size=4, seed=None):
+        if mode not in DATA_SOURCE_MODES:
+            raise ValueError(f"Unknown data source mode: {mode}")
+        self.path = str(path)
+        self.mode = mode
+        self.in_memory = self.path == ':memory:'
+        # An in-memory database only exists inside its one connection
+        self.read_only = read_only and not self.in_memory
+        self.pool_size = pool_size
+        self.seed = seed
+        self.schema = None
+        self._pool = queue.LifoQueue()
+        self._lock = threading.Lock()
+        # Serialises loads without blocking readers, which WAL lets run alongside
+        self._write_lock = threading.Lock()
+        self._memory_conn = None
+
+    def _open(self, read_only):
+        if self.in_memory:
+            if self._memory_conn is None:
+                self._memory_conn = sqlite3.connect(':memory:', check_same_thread=False)
+            return self._memory_conn
+        if read_only:
+            uri = f'{Path(self.path).resolve().as_uri()}?mode=ro'
+            return sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def prepare(self):
+        """Seed or attach the database once, then cache the detected schema."""
+        if self.schema is not None:
+            return self.schema
+        with self._lock:
+            if self.schema is not None:
+                return self.schema
+            conn = self._open(read_only=False)
+            try:
+                schema = detect_schema(conn)
+                if self.mode == 'seed' or (self.mode == 'auto' and 'sales' not in schema):
+                    if self.seed is None:
+                        raise ValueError("Seeding requires a seed function")
+                    self.seed(conn)
+                    schema = detect_schema(conn)
+                validate_schema(schema)
+                if not self.in_memory:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                ensure_sales_indexes(conn)
+            finally:
+                if not self.in_memory:
+                    conn.close()
+            self.schema = schema
+            return schema
+
+    def connect(self, read_only=None):
+        """Open a new caller-owned connection (shared for in-memory databases)."""
+        self.prepare()
+        return self._open(self.read_only if read_only is None else read_only)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for the duration of a ``with`` block."""
+        self.prepare()
+        if self.in_memory:
+            with self._lock:
+                yield self._open(read_only=False)
+            return
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._open(self.read_only)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._pool.qsize() < self.pool_size:
+                self._pool.put(conn)
+            else:
+                conn.close()
+
+    @contextmanager
+    def writer(self):
+        """Open a writable connection for loading data, creating ``sales`` if needed.
+
+        Unlike ``connect`` this never seeds sample data, so uploads into a
+        new database only contain the uploaded rows. Only other writers wait
+        for the load; pooled readers keep reading the last committed data.
+        """
+        # The shared in-memory connection cannot be used by readers meanwhile
+        with self._lock if self.in_memory else self._write_lock:
+            conn = self._open(read_only=False)
+            try:
+                if not self.in_memory:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                create_table(conn, 'sales')
+                validate_schema(detect_schema(conn))
+                ensure_sales_indexes(conn)
+                yield conn
+            finally:
+                if not self.in_memory:
+                    conn.close()
+
+    def close(self):
+        """Close every pooled connection."""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+        if self._memory_conn is not None:
+            self._memory_conn.close()
+            self._memory_conn = None
+        self.schema = None
+
+
+def source_fingerprint(conn, checksum=True):
+    """Summarise the ``sales`` table so changed data can be detected.
+
+    Row count, latest date and highest rowid are cheap index lookups. The
+    optional checksum costs one table scan: it hashes the row count, the
+    sums of every measure and the date range and date sum of each
+    category/region cell, so in-place updates are caught as well as rows
+    moved to another category, region or date.
+    """
+    max_date, max_rowid = conn.execute('SELECT MAX(date), MAX(rowid) FROM sales').fetchone()
+    fingerprint = {'max_date': max_date, 'max_rowid': max_rowid}
+    if checksum:
+        cells = conn.execute(
+            """
+            SELECT product_category, region, COUNT(*), TOTAL(sales_amount), TOTAL(orders),
+                   TOTAL(customers), MIN(date), MAX(date), TOTAL(julianday(date))
+            FROM sales GROUP BY product_category, region ORDER BY product_category, region
+            """
+        ).fetchall()
+        fingerprint['rows'] = sum(cell[2] for cell in cells)
+        fingerprint['checksum'] = hashlib.sha256(json.dumps(cells).encode()).hexdigest()
+    else:
+        fingerprint['rows'] = conn.execute('SELECT COUNT(*) FROM sales').fetchone()[0]
+    return fingerprint
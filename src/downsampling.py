@@ -0,0 +1,67 @@
+"""
+Time-series downsampling for the interactive dashboard.
+
+Both functions take x/y arrays and return the sorted indices of the points
+to keep, so callers can slice any aligned frame or series with them.
+"""
+
+
+def _as_float(values):
+    import numpy as np
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ns]').astype(np.int64)
+    return values.astype(np.float64)
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: keep ``n_out`` visually significant points.
+
+    The first and last points are always kept; from every bucket in between
+    the point forming the largest triangle with the previously kept point
+    and the average of the next bucket is selected.
+    """
+    import numpy as np
+    x, y = _as_float(x), _as_float(y)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(x, y, n_out):
+    """Keep the minimum and maximum of ``n_out // 2`` equal-width buckets."""
+    import numpy as np
+    y = _as_float(y)
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(np.int64)
+    keep = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            keep.append(start + int(y[start:end].argmin()))
+            keep.append(start + int(y[start:end].argmax()))
+    return np.unique(keep)
+
+
+DOWNSAMPLERS = {
+    'lttb': lttb,
+    'minmax': minmax,
+}
@@ -0,0 +1,184 @@
+"""
+Stage instrumentation for the report pipeline.
+
+``measure`` times a block of work: wall time, CPU time of the current
+process, how far the block raised the process peak RSS and, optionally, the
+tracemalloc peak of the stage. A ``StageRecorder`` collects the records of one pipeline run for the
+result dict and JSON lines logs, and feeds the process-wide ``REGISTRY``,
+which aggregates them per stage for the Prometheus ``/api/metrics`` endpoint.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def peak_rss_bytes():
+    """High-water resident set size of this process, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextmanager
+def measure(stage, trace_memory=False):
+    """Measure the enclosed block and yield its stage record.
+
+    The block may set ``record['rows']``. CPU time only covers the current
+    process, so work handed to other processes must be measured there (see
+    ``run_stage``). With ``trace_memory`` the record also holds the peak
+    traced Python allocation during the block; tracing slows the block down.
+
+    ``peak_rss_increase_bytes`` is how much the block raised the process
+    high-water RSS. It is 0 when the block stayed below an earlier peak, so
+    it singles out the stages that set a new high-water mark.
+    """
+    record = {'stage': stage, 'rows': None, 'pid': os.getpid()}
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    elif trace_memory:
+        tracemalloc.reset_peak()
+    rss = peak_rss_bytes()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record['wall_seconds'] = time.perf_counter() - wall
+        record['cpu_seconds'] = time.process_time() - cpu
+        if rss is not None:
+            record['peak_rss_increase_bytes'] = peak_rss_bytes() - rss
+        if trace_memory:
+            record['tracemalloc_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+
+
+def run_stage(stage, trace_memory, func, *args):
+    """Call ``func(*args)`` under ``measure``; returns ``(result, record)``.
+
+    Module-level so it can be submitted to a process pool.
+    """
+    with measure(stage, trace_memory) as record:
+        result = func(*args)
+    return result, record
+
+
+class MetricsRegistry:
+    """Thread-safe per-stage totals rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, record):
+        """Fold one stage record into the totals."""
+        with self._lock:
+            totals = self._stages.setdefault(record['stage'], {
+                'runs': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': 0, 'last_wall_seconds': 0.0,
+            })
+            totals['runs'] += 1
+            totals['wall_seconds'] += record['wall_seconds']
+            totals['cpu_seconds'] += record['cpu_seconds']
+            totals['rows'] += record.get('rows') or 0
+            totals['last_wall_seconds'] = record['wall_seconds']
+
+    def snapshot(self):
+        """Copy of the per-stage totals."""
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in self._stages.items()}
+
+    def render_prometheus(self, gauges=None):
+        """Prometheus exposition text for the stage totals and ``gauges``.
+
+        ``gauges`` maps a metric name to ``(help, value)``.
+        """
+        stages = self.snapshot()
+        metrics = [
+            ('report_stage_runs_total', 'counter', 'Completed pipeline stage runs.', 'runs'),
+            ('report_stage_wall_seconds_total', 'counter', 'Wall time spent in pipeline stages.', 'wall_seconds'),
+            ('report_stage_cpu_seconds_total', 'counter', 'CPU time spent in pipeline stages.', 'cpu_seconds'),
+            ('report_stage_rows_total', 'counter', 'Rows processed by pipeline stages.', 'rows'),
+            ('report_stage_last_wall_seconds', 'gauge', 'Wall time of the latest run of each stage.',
+             'last_wall_seconds'),
+        ]
+        lines = []
+        for name, kind, help_text, field in metrics:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+            for stage, totals in sorted(stages.items()):
+                lines.append(f'{name}{{stage="{_escape_label(stage)}"}} {totals[field]}')
+        gauges = {
+            'report_process_peak_rss_bytes': ('Peak resident set size of the server process.', peak_rss_bytes()),
+            **(gauges or {}),
+        }
+        for name, (help_text, value) in gauges.items():
+            if value is not None:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._stages.clear()
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REGISTRY = MetricsRegistry()
+
+
+class StageRecorder:
+    """Collect the stage records of one pipeline run."""
+
+    def __init__(self, run, trace_memory=False, registry=REGISTRY):
+        self.run = run
+        self.trace_memory = trace_memory
+        self.registry = registry
+        self.started_at = time.time()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, **labels):
+        """Measure the enclosed block as stage ``name``; yields the record."""
+        with measure(name, self.trace_memory) as record:
+            record.update(labels)
+            yield record
+        self.add(record)
+
+    def add(self, record, **labels):
+        """Add a record measured elsewhere, e.g. returned by ``run_stage``."""
+        record.update(labels)
+        self.stages.append(record)
+        if self.registry is not None:
+            self.registry.observe(record)
+
+    def summary(self):
+        """JSON-friendly summary of the run and its stages."""
+        return {
+            'run': self.run,
+            'started_at': self.started_at,
+            'wall_seconds': time.time() - self.started_at,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'stages': list(self.stages),
+        }
+
+    def write_jsonl(self, path):
+        """Append one JSON line per stage to ``path``."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a') as f:
+            for record in self.stages:
+                f.write(json.dumps({'run': self.run, 'started_at': self.started_at, **record}) + '\n')
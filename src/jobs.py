@@ -0,0 +1,181 @@
+"""
+Background report jobs for the web API.
+
+``JobManager`` runs ``ReportGenerator`` pipelines on a bounded process pool
+so request threads only enqueue work and poll for results. A cap on pending
+jobs provides backpressure: once it is reached, ``submit`` raises
+``JobQueueFull`` instead of queueing more work.
+"""
+
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from .aggregation import analysis_to_dict
+    from .instrumentation import REGISTRY
+    from .report_generator import ReportGenerator, _init_render_worker, check_report_specs
+except ImportError:  # executed as a script from src/
+    from aggregation import analysis_to_dict
+    from instrumentation import REGISTRY
+    from report_generator import ReportGenerator, _init_render_worker, check_report_specs
+
+JOB_TYPES = ('full', 'batch')
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already pending."""
+
+
+def claim_artifacts(generator, artifacts, directory):
+    """Copy artifacts served from the report cache into ``directory``.
+
+    Cache hits point into the shared cache, whose entries can be evicted
+    while the job result is still being downloaded; a job keeps its own copy.
+    """
+    directory = Path(directory)
+    output_dir = generator.output_dir.resolve()
+    if all(Path(path).resolve().is_relative_to(output_dir) for path in artifacts.values()):
+        return artifacts
+    directory.mkdir(parents=True, exist_ok=True)
+    assets = generator.artifact_assets(artifacts) if 'dashboard' in artifacts else []
+    for path in assets:
+        shutil.copy2(path, directory)
+    return {name: shutil.copy2(path, directory) for name, path in artifacts.items()}
+
+
+def run_report_job(config_file, job_type, params, job_id=None):
+    """Run one report job in a worker process and return a JSON-friendly result.
+
+    With a ``job_id`` the artifacts are written to, or copied from the cache
+    into, ``<output_dir>/jobs/<job_id>`` so concurrent jobs never overwrite
+    each other's files and cache eviction never removes them.
+    """
+    generator = ReportGenerator(config_file)
+    if job_id is not None:
+        generator.output_dir = generator.output_dir / 'jobs' / job_id
+        generator.output_dir.mkdir(parents=True, exist_ok=True)
+    # The job pool already provides the parallelism; render inline
+    generator.config['render'] = {**generator.config.get('render', {}), 'parallel': False}
+    try:
+        if job_type == 'full':
+            result = generator.generate_full_report()
+            artifacts = {name: result[name] for name in ('pdf_report', 'dashboard', 'charts')}
+            return {
+                'artifacts': claim_artifacts(generator, artifacts, generator.output_dir),
+                'summary': analysis_to_dict(result['analysis']),
+                'metrics': result['metrics'],
+            }
+        specs = params.get('specs') or generator.get_report_specs(params.get('templates'))
+        results = generator.generate_batch_reports(specs)
+        artifacts = {}
+        for name, result in results.items():
+            files = {artifact: path for artifact, path in result.items() if artifact not in ('analysis', 'metrics')}
+            for artifact, path in claim_artifacts(generator, files, generator.output_dir / name).items():
+                artifacts[f'{name}/{artifact}'] = path
+        return {
+            'artifacts': artifacts,
+            'summary': {name: analysis_to_dict(result['analysis']) for name, result in results.items()},
+            'metrics': next((result['metrics'] for result in results.values()), None),
+        }
+    finally:
+        generator.close()
+
+
+class JobManager:
+    """Submit report jobs to a process pool and track their state."""
+
+    def __init__(self, config_file='config.json', max_workers=None, max_pending=8, max_history=200):
+        self.config_file = config_file
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_history = max_history
+        self._executor = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_render_worker)
+        return self._executor
+
+    def pending(self):
+        """Number of queued or running jobs."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job['future'].done())
+
+    def submit(self, job_type='full', params=None):
+        """Queue a job and return its id right away."""
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type: {job_type}")
+        params = params or {}
+        if 'specs' in params:
+            check_report_specs(params['specs'])
+        with self._lock:
+            if sum(1 for job in self._jobs.values() if not job['future'].done()) >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} jobs already pending")
+            job_id = uuid.uuid4().hex
+            future = self._pool().submit(run_report_job, self.config_file, job_type, params, job_id)
+            self._jobs[job_id] = {
+                'id': job_id,
+                'type': job_type,
+                'params': params,
+                'submitted_at': time.time(),
+                'future': future,
+            }
+            self._prune()
+        future.add_done_callback(lambda _: self._mark_finished(job_id))
+        return job_id
+
+    def _mark_finished(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['finished_at'] = time.time()
+        future = job['future']
+        # Stage timings were recorded in the worker process; fold them in here
+        if not future.cancelled() and future.exception() is None and future.result().get('metrics'):
+            for record in future.result()['metrics']['stages']:
+                REGISTRY.observe(record)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond ``max_history``."""
+        finished = [job_id for job_id, job in self._jobs.items() if job['future'].done()]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return the status dict of a job, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        future = job['future']
+        status = {
+            'id': job['id'],
+            'type': job['type'],
+            'params': job['params'],
+            'submitted_at': job['submitted_at'],
+        }
+        if not future.done():
+            status['status'] = 'running' if future.running() else 'queued'
+        elif future.exception() is not None:
+            status['status'] = 'failed'
+            status['error'] = str(future.exception())
+        else:
+            status['status'] = 'succeeded'
+            status.update(future.result())
+        if 'finished_at' in job:
+            status['finished_at'] = job['finished_at']
+        return status
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
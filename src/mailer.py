@@ -0,0 +1,230 @@
+"""
+Background e-mail delivery for generated reports.
+
+``DeliveryQueue`` runs a few worker threads, each holding one persistent
+SMTP session. Workers take queued messages in batches, send them over the
+same session, reconnect when the server drops an idle session, retry
+transient failures with exponential backoff, fail permanent (5xx) rejections
+right away and record the latency of every send.
+"""
+
+import queue
+from collections import deque
+import smtplib
+import threading
+import time
+from concurrent.futures import Future
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from functools import lru_cache
+from pathlib import Path
+
+_STOP = object()
+
+# Rejections of one message; the session stays usable afterwards
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+def smtp_code(exc):
+    """SMTP reply code behind ``exc``, or None for network errors.
+
+    A refusal of several recipients reports the lowest code, so that one
+    deferred (4xx) recipient keeps the message retryable.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return min((code for code, _ in exc.recipients.values()), default=None)
+    return getattr(exc, 'smtp_code', None)
+
+
+def is_permanent(exc):
+    """Whether retrying ``exc`` is pointless (a 5xx reply, e.g. an unknown mailbox or bad credentials)."""
+    code = smtp_code(exc)
+    return code is not None and code >= 500
+
+
+@lru_cache(maxsize=16)
+def _encoded_attachment(path, mtime_ns):
+    """Base64-encoded PDF part, shared by every message attaching the same file."""
+    part = MIMEBase('application', 'octet-stream')
+    with open(path, 'rb') as attachment:
+        part.set_payload(attachment.read())
+    encoders.encode_base64(part)
+    part.add_header('Content-Disposition', f'attachment; filename= {Path(path).name}')
+    return part
+
+
+def build_report_message(sender, recipients, subject, body, attachment_path=None):
+    """Build a MIME message with an optional PDF attachment."""
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = ', '.join(recipients)
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    if attachment_path is not None:
+        path = str(attachment_path)
+        msg.attach(_encoded_attachment(path, Path(path).stat().st_mtime_ns))
+    return msg
+
+
+class DeliveryQueue:
+    """Queue of outgoing messages delivered over pooled SMTP sessions."""
+
+    def __init__(self, smtp_server, smtp_port, sender_email='', sender_password='', use_tls=True,
+                 workers=2, batch_size=20, max_retries=3, backoff=1.0, timeout=30):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.use_tls = use_tls
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._counters = {'sent': 0, 'failed': 0, 'retries': 0, 'connections': 0}
+
+    @classmethod
+    def from_settings(cls, email_settings):
+        """Create a queue from the ``email_settings`` config section."""
+        delivery = email_settings.get('delivery', {})
+        return cls(
+            email_settings['smtp_server'],
+            email_settings['smtp_port'],
+            sender_email=email_settings.get('sender_email', ''),
+            sender_password=email_settings.get('sender_password', ''),
+            use_tls=email_settings.get('use_tls', True),
+            **delivery
+        )
+
+    def start(self):
+        """Start the worker threads (idempotent)."""
+        with self._lock:
+            if self._threads:
+                return self
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'smtp-delivery-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, msg, recipients):
+        """Queue ``msg`` for ``recipients``; returns a Future resolved after delivery."""
+        future = Future()
+        self._queue.put((msg.as_bytes(), list(recipients), future))
+        self.start()
+        return future
+
+    def stop(self, wait=True):
+        """Stop the workers after the queued messages have been delivered."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def metrics(self):
+        """Delivery counters and latency statistics (seconds) over the last 1000 sends."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            metrics = dict(self._counters)
+        metrics['queued'] = self._queue.qsize()
+        if latencies:
+            metrics['latency_avg'] = sum(latencies) / len(latencies)
+            metrics['latency_p95'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            metrics['latency_max'] = latencies[-1]
+        return metrics
+
+    def _connect(self):
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.sender_password:
+                server.login(self.sender_email, self.sender_password)
+        except (smtplib.SMTPException, OSError):
+            server.close()
+            raise
+        with self._lock:
+            self._counters['connections'] += 1
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _next_batch(self):
+        """Block for one item, then take whatever else is queued up to the batch size."""
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not _STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        server = None
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            for item in batch:
+                server = self._deliver(server, *item)
+            if stop:
+                break
+        if server is not None:
+            self._close(server)
+
+    def _deliver(self, server, payload, recipients, future):
+        """Send one message, retrying transient errors with exponential backoff; returns the live session."""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            reused = server is not None
+            try:
+                if server is None:
+                    server = self._connect()
+                server.sendmail(self.sender_email, recipients, payload)
+            except smtplib.SMTPServerDisconnected as exc:
+                # An idle pooled session was dropped by the server: reconnect once for free
+                server, error = None, exc
+                if reused:
+                    continue
+            except MESSAGE_ERRORS as exc:
+                error = exc
+                # 421: the server is shutting the session down
+                if smtp_code(exc) == 421:
+                    server.close()
+                    server = None
+            except (smtplib.SMTPException, OSError) as exc:
+                if server is not None:
+                    server.close()
+                server, error = None, exc
+            else:
+                latency = time.perf_counter() - started
+                with self._lock:
+                    self._counters['sent'] += 1
+                    self._latencies.append(latency)
+                future.set_result(latency)
+                return server
+            if attempt >= self.max_retries or is_permanent(error):
+                with self._lock:
+                    self._counters['failed'] += 1
+                future.set_exception(error)
+                return server
+            with self._lock:
+                self._counters['retries'] += 1
+            time.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
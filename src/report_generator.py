@@ -3,33 +3,116 @@
 Automated Report Generator
 Advanced Python-based report generation system with multiple output formats,
 data visualization, and automated scheduling capabilities.
-"""
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+The heavy backends (pandas, matplotlib, plotly, reportlab) are imported by
+the stages that use them, so importing this module, starting the web app or
+spawning a worker stays fast.
+"""
 
-from datetime import datetime, timedelta
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+import argparse
+from functools import lru_cache, partial
 import json
+import math
+import os
+import re
 import sqlite3
 from pathlib import Path
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-import schedule
-import time
-
-import plotly.graph_objects as go
-import plotly.express as px
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-import warnings
-warnings.filterwarnings('ignore')
+
+try:
+    from .aggregation import (SALES_COLUMNS, AggregateStateStore, SalesAggregate, build_where,
+                              ensure_sales_indexes)
+    from .artifact_cache import ArtifactCache, cache_key
+    from .customer_analysis import CustomerAggregate, customer_fingerprint, has_customers_table
+    from .data_sources import (SQLiteDataSource, bulk_insert, create_table, ingest_sales,
+                               read_sales_chunks, source_fingerprint)
+    from .downsampling import DOWNSAMPLERS
+    from .instrumentation import StageRecorder, run_stage
+    from .mailer import DeliveryQueue, build_report_message
+    from .parquet_source import ParquetDataSource
+    from .pdf_tables import bar_chart, build_pdf, long_table, paragraph_styles, table_style
+    from .scheduler import Scheduler
+except ImportError:  # executed as a script: python src/report_generator.py
+    from aggregation import (SALES_COLUMNS, AggregateStateStore, SalesAggregate, build_where,
+                             ensure_sales_indexes)
+    from artifact_cache import ArtifactCache, cache_key
+    from customer_analysis import CustomerAggregate, customer_fingerprint, has_customers_table
+    from data_sources import (SQLiteDataSource, bulk_insert, create_table, ingest_sales,
+                              read_sales_chunks, source_fingerprint)
+    from downsampling import DOWNSAMPLERS
+    from instrumentation import StageRecorder, run_stage
+    from mailer import DeliveryQueue, build_report_message
+    from parquet_source import ParquetDataSource
+    from pdf_tables import bar_chart, build_pdf, long_table, paragraph_styles, table_style
+    from scheduler import Scheduler
+
+def _init_render_worker():
+    """Use the non-interactive Agg backend in render worker processes."""
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _pyplot():
+    """Import pyplot on the non-interactive Agg backend; charts are only saved to files."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+DASHBOARD_DEFAULTS = {
+    'max_points': 2000,
+    'downsample': 'lttb',
+    'webgl_threshold': 1000,
+    'plotlyjs': 'directory'
+}
+PLOTLYJS_BUNDLE = 'plotly.min.js'
+
+SCHEDULER_DEFAULTS = {
+    'state_path': None,
+    'max_workers': 2,
+    'misfire': 'run_once',
+    'misfire_grace': 3600,
+    'overlap': 'skip'
+}
+
+# DPI per chart render profile; panel PNGs are smaller, so they get more DPI
+RENDER_PROFILES = {
+    'draft': {'dpi': 60, 'panel_dpi': 72},
+    'screen': {'dpi': 100, 'panel_dpi': 120},
+    'print': {'dpi': 300, 'panel_dpi': 300}
+}
+CHART_PANELS = ('daily_trend', 'category', 'region', 'monthly')
+CHART_FIGSIZE = (15, 12)
+CHART_LAYOUT = {'left': 0.07, 'right': 0.97, 'bottom': 0.08, 'top': 0.96, 'wspace': 0.22, 'hspace': 0.35}
+PANEL_FIGSIZE = (7.5, 6)
+PANEL_LAYOUT = {'left': 0.13, 'right': 0.96, 'bottom': 0.18, 'top': 0.92}
+
+
+@lru_cache(maxsize=1)
+def chart_style():
+    """Name of the first available chart style, resolved once per process."""
+    plt = _pyplot()
+    for style in ('seaborn-v0_8', 'seaborn', 'ggplot'):
+        if style in plt.style.available:
+            return style
+    return 'default'
+
+PRODUCT_CATEGORIES = ['Electronics', 'Clothing', 'Books', 'Home', 'Sports']
+REGIONS = ['North', 'South', 'East', 'West', 'Central']
+
+# Report names become directories under output_dir: no separators, no '..'
+REPORT_NAME = re.compile(r'[A-Za-z0-9][A-Za-z0-9_.-]*')
+
+
+def check_report_specs(specs):
+    """Raise ValueError unless ``specs`` is a list of spec dicts with safe names."""
+    if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+        raise ValueError("Report specs must be a list of objects")
+    for spec in specs:
+        name = spec.get('name')
+        if not isinstance(name, str) or not REPORT_NAME.fullmatch(name):
+            raise ValueError(f"Invalid report name: {name!r}")
 
 class ReportGenerator:
     def __init__(self, config_file='config.json'):
@@ -38,6 +121,18 @@ class ReportGenerator:
         self.data_sources = {}
         self.output_dir = Path(self.config.get('output_directory', 'reports'))
         self.output_dir.mkdir(exist_ok=True)
+        # Caches and persisted state stay here when output_dir is redirected
+        self.state_dir = self.output_dir
+        self._render_pool = None
+        self._delivery_queue = None
+    
+    def __getstate__(self):
+        """Drop connections and pools when shipping the generator to a worker."""
+        state = self.__dict__.copy()
+        state['data_sources'] = {}
+        state['_render_pool'] = None
+        state['_delivery_queue'] = None
+        return state
         
     def load_config(self, config_file):
         """Load configuration from JSON file."""
@@ -51,11 +146,60 @@ class ReportGenerator:
         """Create default configuration."""
         default_config = {
             "output_directory": "reports",
+            "data_source": {
+                "type": "sqlite",
+                "path": "sample_data.db",
+                "mode": "auto",
+                "read_only": True,
+                "pool_size": 4
+            },
+            "analysis": {
+                "engine": "auto",
+                "customers": True
+            },
+            "render": {
+                "parallel": True,
+                "max_workers": 3,
+                "profile": "print",
+                "panels": False,
+                "pdf_tables": [],
+                "pdf_chunk_rows": 100
+            },
+            "dashboard": {
+                "max_points": 2000,
+                "downsample": "lttb",
+                "webgl_threshold": 1000,
+                "plotlyjs": "directory"
+            },
+            "instrumentation": {
+                "tracemalloc": False,
+                "jsonl_path": None
+            },
+            "scheduler": {
+                "state_path": None,
+                "max_workers": 2,
+                "misfire": "run_once",
+                "misfire_grace": 3600,
+                "overlap": "skip"
+            },
+            "cache": {
+                "enabled": True,
+                "max_entries": 32,
+                "max_mb": 512,
+                "checksum": True
+            },
             "email_settings": {
                 "smtp_server": "smtp.gmail.com",
                 "smtp_port": 587,
                 "sender_email": "",
-                "sender_password": ""
+                "sender_password": "",
+                "use_tls": True,
+                "delivery": {
+                    "workers": 2,
+                    "batch_size": 20,
+                    "max_retries": 3,
+                    "backoff": 1.0
+                }
             },
             "report_templates": {
                 "sales_report": {
@@ -74,58 +218,160 @@ class ReportGenerator:
             json.dump(default_config, f, indent=2)
         return default_config
     
-    def connect_database(self, db_path='sample_data.db'):
-        """Connect to SQLite database and create sample data."""
-        conn = sqlite3.connect(db_path)
-        self.create_sample_data(conn)
-        return conn
-    
-    def create_sample_data(self, conn):
-        """Create sample data for demonstration."""
-        # Sales data
-        dates = pd.date_range(start='2024-01-01', end='2024-12-31', freq='D')
-        sales_data = []
-        
-        for date in dates:
-            # Simulate seasonal trends
-            base_sales = 1000 + np.sin(date.dayofyear * 2 * np.pi / 365) * 200
-            daily_sales = max(0, np.random.normal(base_sales, 150))
-            
-            sales_data.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'sales_amount': round(daily_sales, 2),
-                'orders': np.random.poisson(daily_sales / 50),
-                'customers': np.random.poisson(daily_sales / 100),
-                'product_category': np.random.choice(['Electronics', 'Clothing', 'Books', 'Home', 'Sports']),
-                'region': np.random.choice(['North', 'South', 'East', 'West', 'Central'])
-            })
-        
-        df_sales = pd.DataFrame(sales_data)
-        df_sales.to_sql('sales', conn, if_exists='replace', index=False)
-        
-        # Customer data
-        customer_data = []
-        for i in range(1000):
-            customer_data.append({
-                'customer_id': f'CUST_{i:04d}',
-                'age': np.random.randint(18, 80),
-                'gender': np.random.choice(['M', 'F']),
-                'location': np.random.choice(['Urban', 'Suburban', 'Rural']),
-                'lifetime_value': round(np.random.exponential(500), 2),
-                'acquisition_date': (datetime.now() - timedelta(days=np.random.randint(1, 365))).strftime('%Y-%m-%d')
-            })
-        
-        df_customers = pd.DataFrame(customer_data)
-        df_customers.to_sql('customers', conn, if_exists='replace', index=False)
-        
-        conn.commit()
-    
-    def load_data(self, query, conn):
-        """Load data from database using SQL query."""
-        return pd.read_sql_query(query, conn)
-    
-    def generate_sales_analysis(self, conn):
-        """Generate comprehensive sales analysis."""
+    def connect_database(self, db_path='sample_data.db', mode='auto'):
+        """Connect to a SQLite database, seeding it with sample data if needed.
+
+        ``mode`` is ``'seed'`` to always (re)create the sample data,
+        ``'attach'`` to use existing tables as is, or ``'auto'`` to seed only
+        a database without a ``sales`` table. The returned connection is
+        writable and owned by the caller.
+        """
+        source = SQLiteDataSource(db_path, mode=mode, read_only=False, seed=self.create_sample_data)
+        return source.connect()
+    
+    def get_data_source(self, db_path=None):
+        """Return the pooled data source for ``db_path``, reused across runs.
+
+        Settings come from the ``data_source`` config section; report jobs
+        get read-only connections by default.
+        """
+        settings = self.config.get('data_source', {})
+        db_path = str(db_path or settings.get('path', 'sample_data.db'))
+        if db_path in self.data_sources:
+            return self.data_sources[db_path]
+        if settings.get('type', 'sqlite') == 'parquet':
+            self.data_sources[db_path] = ParquetDataSource(
+                db_path,
+                mode=settings.get('mode', 'auto'),
+                seed=self.create_sample_data,
+                batch_size=settings.get('batch_size', 1_000_000)
+            )
+        else:
+            self.data_sources[db_path] = SQLiteDataSource(
+                db_path,
+                mode=settings.get('mode', 'auto'),
+                read_only=settings.get('read_only', True),
+                pool_size=settings.get('pool_size', 4),
+                seed=self.create_sample_data
+            )
+        return self.data_sources[db_path]
+    
+    def close(self):
+        """Close the pooled data source connections, render workers and mail queue."""
+        for source in self.data_sources.values():
+            source.close()
+        self.data_sources.clear()
+        if self._render_pool is not None:
+            self._render_pool.shutdown()
+            self._render_pool = None
+        if self._delivery_queue is not None:
+            # Deliver what is still queued before exiting
+            self._delivery_queue.stop()
+            self._delivery_queue = None
+    
+    def create_sample_data(self, conn, n_rows=None, start_date='2024-01-01', end_date='2024-12-31',
+                           n_customers=1000, seed=None, chunk_size=100_000):
+        """Create sample data for demonstration and load testing.
+
+        Rows are generated with vectorized numpy draws and written with
+        ``executemany`` in chunks of ``chunk_size`` inside one transaction.
+        ``n_rows`` defaults to one sales row per day; larger values spread
+        several rows over each day. The same ``seed`` and ``chunk_size``
+        always produce the same dataset.
+        """
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        date_strings = np.datetime_as_string(dates, unit='D')
+        day_of_year = (dates - dates.astype('datetime64[Y]')).astype(np.int64) + 1
+        base_sales = 1000 + np.sin(day_of_year * 2 * np.pi / 365) * 200
+        categories = np.array(PRODUCT_CATEGORIES)
+        regions = np.array(REGIONS)
+        n_rows = len(dates) if n_rows is None else n_rows
+
+        with conn:
+            # Sales data: rows are spread evenly over the date range
+            create_table(conn, 'sales', replace=True)
+            for start in range(0, n_rows, chunk_size):
+                stop = min(start + chunk_size, n_rows)
+                day_index = np.arange(start, stop) * len(dates) // n_rows
+                sales_amount = np.maximum(0, rng.normal(base_sales[day_index], 150))
+                orders = rng.poisson(sales_amount / 50)
+                customers = rng.poisson(sales_amount / 100)
+                bulk_insert(conn, 'sales', zip(
+                    date_strings[day_index].tolist(),
+                    sales_amount.round(2).tolist(),
+                    orders.tolist(),
+                    customers.tolist(),
+                    categories[rng.integers(0, len(categories), stop - start)].tolist(),
+                    regions[rng.integers(0, len(regions), stop - start)].tolist(),
+                ))
+
+            # Customer data: acquired during the year before the last sales date
+            create_table(conn, 'customers', replace=True)
+            for start in range(0, n_customers, chunk_size):
+                stop = min(start + chunk_size, n_customers)
+                size = stop - start
+                customer_ids = np.char.add('CUST_', np.char.zfill(np.arange(start, stop).astype(str), 4))
+                acquisition = dates[-1] - rng.integers(1, 365, size)
+                bulk_insert(conn, 'customers', zip(
+                    customer_ids.tolist(),
+                    rng.integers(18, 80, size).tolist(),
+                    rng.choice(['M', 'F'], size).tolist(),
+                    rng.choice(['Urban', 'Suburban', 'Rural'], size).tolist(),
+                    rng.exponential(500, size).round(2).tolist(),
+                    np.datetime_as_string(acquisition, unit='D').tolist(),
+                ))
+    
+    def ingest_sales_file(self, fileobj, file_format='csv', chunksize=50_000, db_path=None):
+        """Stream a CSV or Parquet file of sales rows into the report database.
+
+        The file is validated and inserted chunk by chunk in a single
+        transaction, so a bad row leaves the database untouched. Returns
+        the row count and throughput reported by ``ingest_sales``.
+        """
+        source = self.get_data_source(db_path)
+        chunks = read_sales_chunks(fileobj, file_format, chunksize)
+        if isinstance(source, ParquetDataSource):
+            stats = source.ingest(chunks)
+        else:
+            with source.writer() as conn:
+                stats = ingest_sales(conn, chunks)
+        print(f"Ingested {stats['rows']} rows ({stats['rows_per_second']} rows/s)")
+        return stats
+    
+    def load_data(self, query, conn, chunksize=None):
+        """Load data from database using SQL query.
+
+        With ``chunksize`` an iterator of DataFrames is returned instead.
+        """
+        import pandas as pd
+        return pd.read_sql_query(query, conn, chunksize=chunksize)
+    
+    def generate_sales_analysis(self, conn, engine='auto', chunksize=None):
+        """Generate comprehensive sales analysis.
+
+        ``engine`` selects how the KPIs are computed:
+
+        - ``'sql'``: aggregate inside SQLite and only fetch the grouped
+          results; the returned frame holds per-day totals.
+        - ``'incremental'``: fold rows newer than the stored watermark into
+          persisted partial aggregates (see ``incremental_sales_aggregate``).
+        - ``'stream'``: read the rows in chunks of ``chunksize`` and merge
+          partial aggregates, so memory stays bounded for any table size.
+        - ``'pandas'``: load every row with ``SELECT *`` and aggregate in memory.
+        - ``'parquet'``: scan a ``ParquetDataSource`` (passed as ``conn``)
+          column-wise with Arrow, batch by batch.
+        - ``'auto'``: ``'parquet'`` for Parquet sources, ``'sql'`` for SQLite
+          connections, otherwise ``'stream'`` when a ``chunksize`` is given
+          and ``'pandas'`` if not.
+        """
+        import pandas as pd
+        engine = self.resolve_engine(conn, engine, chunksize)
+        if engine != 'pandas':
+            aggregate = self.build_sales_aggregate(conn, engine, chunksize)
+            return aggregate.to_analysis(), aggregate.daily_frame()
+
         # Load sales data
         sales_df = self.load_data("SELECT * FROM sales", conn)
         sales_df['date'] = pd.to_datetime(sales_df['date'])
@@ -148,74 +394,313 @@ class ReportGenerator:
         
         return analysis, sales_df
     
-    def create_visualizations(self, sales_df, analysis):
-        """Create various visualizations for the report."""
-        try:
-            plt.style.use('seaborn-v0_8')
-        except OSError:
-            try:
-                plt.style.use('seaborn')
-            except OSError:
-                plt.style.use('ggplot')
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-        
-        # Daily sales trend
-        daily_sales = sales_df.groupby('date')['sales_amount'].sum()
-        axes[0, 0].plot(daily_sales.index, daily_sales.values, linewidth=2, color='#2E86AB')
-        axes[0, 0].set_title('Daily Sales Trend', fontsize=14, fontweight='bold')
-        axes[0, 0].set_xlabel('Date')
-        axes[0, 0].set_ylabel('Sales Amount ($)')
-        axes[0, 0].grid(True, alpha=0.3)
-        
-        # Category performance
-        category_data = analysis['category_performance']
-        axes[0, 1].bar(category_data.index, category_data.values, color='#A23B72')
-        axes[0, 1].set_title('Sales by Product Category', fontsize=14, fontweight='bold')
-        axes[0, 1].set_xlabel('Category')
-        axes[0, 1].set_ylabel('Sales Amount ($)')
-        axes[0, 1].tick_params(axis='x', rotation=45)
-        
-        # Regional performance
-        regional_data = analysis['regional_performance']
-        axes[1, 0].pie(regional_data.values, labels=regional_data.index, autopct='%1.1f%%', 
-                       colors=['#F18F01', '#C73E1D', '#2E86AB', '#A23B72', '#F24236'])
-        axes[1, 0].set_title('Sales Distribution by Region', fontsize=14, fontweight='bold')
-        
-        # Monthly trends
-        monthly_data = analysis['monthly_trends']
-        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        axes[1, 1].bar(months, monthly_data['sales_amount'].values, color='#F18F01')
-        axes[1, 1].set_title('Monthly Sales Performance', fontsize=14, fontweight='bold')
-        axes[1, 1].set_xlabel('Month')
-        axes[1, 1].set_ylabel('Sales Amount ($)')
-        axes[1, 1].tick_params(axis='x', rotation=45)
-        
-        plt.tight_layout()
-        chart_path = self.output_dir / 'sales_analysis_charts.png'
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
+    def instrumented_sales_analysis(self, conn, recorder):
+        """Run the configured sales analysis as recorded stages.
+
+        Aggregating engines are recorded as an ``aggregate`` stage (the scan,
+        with the source row count) followed by an ``analysis`` stage (the
+        breakdowns over the partials); the pandas engine is a single
+        ``analysis`` stage.
+        """
+        settings = self.config.get('analysis', {})
+        chunksize = settings.get('chunksize')
+        engine = self.resolve_engine(conn, settings.get('engine', 'auto'), chunksize)
+        if engine == 'pandas':
+            with recorder.stage('analysis', engine=engine) as record:
+                analysis, sales_df = self.generate_sales_analysis(conn, engine=engine)
+                record['rows'] = len(sales_df)
+            return analysis, sales_df
+        with recorder.stage('aggregate', engine=engine) as record:
+            aggregate = self.build_sales_aggregate(conn, engine, chunksize)
+            record['rows'] = aggregate.row_count
+        with recorder.stage('analysis', engine=engine) as record:
+            analysis, sales_df = aggregate.to_analysis(), aggregate.daily_frame()
+            record['rows'] = len(aggregate.partials)
+        return analysis, sales_df
+    
+    def build_customer_aggregate(self, conn):
+        """Compute the mergeable ``CustomerAggregate`` of the ``customers`` table.
+
+        SQLite groups the customers in SQL, a Parquet source is scanned in
+        Arrow batches and other connections load the table into pandas.
+        """
+        if isinstance(conn, ParquetDataSource):
+            return conn.customer_aggregate()
+        if isinstance(conn, sqlite3.Connection):
+            return CustomerAggregate.from_sql(conn)
+        return CustomerAggregate.from_frame(self.load_data("SELECT * FROM customers", conn))
+    
+    def generate_customer_analysis(self, conn):
+        """Generate the customer analysis: acquisition cohorts, LTV and segments.
+
+        Returns None when the source has no customers.
+        """
+        aggregate = self.build_customer_aggregate(conn)
+        return None if aggregate.empty else aggregate.to_analysis()
+    
+    def instrumented_customer_analysis(self, conn, recorder):
+        """Run the customer analysis as a ``customer_analysis`` stage.
+
+        Returns None when it is disabled with ``analysis.customers`` or the
+        source has no customers.
+        """
+        if not self.config.get('analysis', {}).get('customers', True):
+            return None
+        with recorder.stage('customer_analysis') as record:
+            aggregate = self.build_customer_aggregate(conn)
+            record['rows'] = aggregate.customer_count
+            return None if aggregate.empty else aggregate.to_analysis()
+    
+    def resolve_engine(self, conn, engine='auto', chunksize=None):
+        """Pick the concrete analysis engine for ``engine='auto'``."""
+        if isinstance(conn, ParquetDataSource):
+            if engine not in ('auto', 'parquet'):
+                raise ValueError(f"Engine '{engine}' cannot read a Parquet data source")
+            return 'parquet'
+        if engine == 'auto':
+            if isinstance(conn, sqlite3.Connection):
+                return 'sql'
+            return 'stream' if chunksize else 'pandas'
+        if engine not in ('sql', 'incremental', 'stream', 'pandas'):
+            raise ValueError(f"Unknown analysis engine: {engine}")
+        return engine
+    
+    def build_sales_aggregate(self, conn, engine='auto', chunksize=None):
+        """Compute the mergeable ``SalesAggregate`` behind the sales analysis.
+
+        One aggregate holds every per-category/region breakdown, so it can
+        be sliced into segment analyses without scanning the source again.
+        """
+        engine = self.resolve_engine(conn, engine, chunksize)
+        if engine == 'parquet':
+            return conn.sales_aggregate()
+        if engine == 'sql':
+            return self.sql_sales_aggregate(conn)
+        if engine == 'incremental':
+            return self.incremental_sales_aggregate(conn)
+        if engine == 'stream':
+            return self.streaming_sales_aggregate(conn, chunksize=chunksize or 100_000)
+        return SalesAggregate.from_frame(self.load_data("SELECT * FROM sales", conn))
+    
+    def filtered_sales_analysis(self, conn, start_date=None, end_date=None, segment=None):
+        """Sales analysis restricted to a date range and segment.
+
+        The filters are pushed down to SQLite or to the Parquet scan.
+        Raises ValueError when no rows match.
+        """
+        if isinstance(conn, ParquetDataSource):
+            return conn.sales_aggregate(start_date, end_date, segment).to_analysis()
+        ensure_sales_indexes(conn)
+        return SalesAggregate.from_sql(conn, *build_where(start_date, end_date, segment)).to_analysis()
+    
+    def sql_sales_aggregate(self, conn):
+        """Aggregate the sales table with grouped SQL queries.
+
+        Only the grouped partials leave the database, and the analysis frame
+        holds per-day totals instead of every sales row.
+        """
+        ensure_sales_indexes(conn)
+        return SalesAggregate.from_sql(conn)
+    
+    def incremental_sales_aggregate(self, conn, state_path=None, source=None, full_refresh=False):
+        """Aggregate the sales table by folding new rows into stored aggregates.
+
+        Partial aggregates are kept in ``state_path`` (by default
+        ``analysis_state.db`` in the output directory) together with the
+        latest date already folded in. Each run only scans rows from that
+        watermark day onwards; the watermark day itself is re-read so rows
+        added to it later are not lost. The stored state is rebuilt when
+        ``full_refresh`` is set, the source no longer reaches the watermark,
+        or the row count or sales total before the watermark no longer match
+        the stored partials (history was deleted, updated or reseeded).
+        In-memory databases have no stable identity, so they are aggregated
+        in full and no state is kept.
+        """
+        ensure_sales_indexes(conn)
+        if source is None:
+            source = conn.execute('PRAGMA database_list').fetchone()[2]
+        if not source:
+            return SalesAggregate.from_sql(conn)
+        if state_path is None:
+            state_path = self.config.get('analysis', {}).get('state_path', self.state_dir / 'analysis_state.db')
+        store = AggregateStateStore(state_path)
+
+        aggregate, watermark = store.load(source)
+        latest = conn.execute('SELECT MAX(date) FROM sales').fetchone()[0]
+        if (full_refresh or watermark is None or latest is None or latest < watermark
+                or not self._history_matches(conn, aggregate, watermark)):
+            watermark = None
+            aggregate = delta = SalesAggregate.from_sql(conn)
+        else:
+            where, params = build_where(start_date=watermark)
+            delta = SalesAggregate.from_sql(conn, where, params)
+            base = SalesAggregate(aggregate.partials[aggregate.partials['date'] < watermark], aggregate.extremes)
+            aggregate = base.merge(delta) if not base.empty else delta
+        store.save(source, aggregate, delta, since=watermark)
+        return aggregate
+    
+    @staticmethod
+    def _history_matches(conn, aggregate, watermark):
+        """Whether the rows before ``watermark`` still add up to the stored partials."""
+        # An index range count on idx_sales_date plus one sum, far cheaper than a rebuild
+        rows, sales = conn.execute(
+            'SELECT COUNT(*), TOTAL(sales_amount) FROM sales WHERE date < ?', (watermark,)
+        ).fetchone()
+        stored = aggregate.partials[aggregate.partials['date'] < watermark]
+        return (rows == int(stored['rows'].sum())
+                and math.isclose(sales, float(stored['sales_amount'].sum()), rel_tol=1e-12, abs_tol=0.005))
+    
+    def streaming_sales_aggregate(self, conn, chunksize=100_000):
+        """Aggregate the sales table in chunks of at most ``chunksize`` rows.
+
+        Each chunk is reduced to partial aggregates and merged into a running
+        total, so peak memory depends on the chunk size and the number of
+        distinct days/categories/regions, not on the table size.
+        """
+        aggregate = SalesAggregate()
+        query = f"SELECT {', '.join(SALES_COLUMNS)} FROM sales"
+        for chunk in self.load_data(query, conn, chunksize=chunksize):
+            aggregate = aggregate.merge(SalesAggregate.from_frame(chunk))
+        return aggregate
+    
+    def render_profile(self, profile=None):
+        """Resolve a chart render profile name (default: ``render.profile``)."""
+        profile = profile or self.config.get('render', {}).get('profile', 'print')
+        if profile not in RENDER_PROFILES:
+            raise ValueError(f"Unknown render profile: {profile}")
+        return RENDER_PROFILES[profile]
+    
+    def draw_chart_panel(self, ax, panel, sales_df, analysis):
+        """Draw one of the ``CHART_PANELS`` onto ``ax``."""
+        if panel == 'daily_trend':
+            # Daily sales trend
+            daily_sales = sales_df.groupby('date')['sales_amount'].sum()
+            ax.plot(daily_sales.index, daily_sales.values, linewidth=2, color='#2E86AB')
+            ax.set_title('Daily Sales Trend', fontsize=14, fontweight='bold')
+            ax.set_xlabel('Date')
+            ax.set_ylabel('Sales Amount ($)')
+            ax.grid(True, alpha=0.3)
+        elif panel == 'category':
+            # Category performance
+            category_data = analysis['category_performance']
+            ax.bar(category_data.index, category_data.values, color='#A23B72')
+            ax.set_title('Sales by Product Category', fontsize=14, fontweight='bold')
+            ax.set_xlabel('Category')
+            ax.set_ylabel('Sales Amount ($)')
+            ax.tick_params(axis='x', rotation=45)
+        elif panel == 'region':
+            # Regional performance
+            regional_data = analysis['regional_performance']
+            ax.pie(regional_data.values, labels=regional_data.index, autopct='%1.1f%%', 
+                   colors=['#F18F01', '#C73E1D', '#2E86AB', '#A23B72', '#F24236'])
+            ax.set_title('Sales Distribution by Region', fontsize=14, fontweight='bold')
+        elif panel == 'monthly':
+            # Monthly trends
+            monthly_data = analysis['monthly_trends']
+            months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+                     'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+            ax.bar([months[m - 1] for m in monthly_data.index], monthly_data['sales_amount'].values, color='#F18F01')
+            ax.set_title('Monthly Sales Performance', fontsize=14, fontweight='bold')
+            ax.set_xlabel('Month')
+            ax.set_ylabel('Sales Amount ($)')
+            ax.tick_params(axis='x', rotation=45)
+        else:
+            raise ValueError(f"Unknown chart panel: {panel}")
+    
+    def create_visualizations(self, sales_df, analysis, output_dir=None, profile=None):
+        """Create various visualizations for the report.
+
+        ``profile`` picks the DPI from ``RENDER_PROFILES`` (``'draft'``,
+        ``'screen'`` or ``'print'``). The figure uses a fixed layout instead
+        of recomputing a tight bounding box on every save.
+        """
+        plt = _pyplot()
+        settings = self.render_profile(profile)
+        with plt.style.context(chart_style()):
+            fig, axes = plt.subplots(2, 2, figsize=CHART_FIGSIZE)
+            for ax, panel in zip(axes.flat, CHART_PANELS):
+                self.draw_chart_panel(ax, panel, sales_df, analysis)
+            fig.subplots_adjust(**CHART_LAYOUT)
+            
+            output_dir = Path(output_dir or self.output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            chart_path = output_dir / 'sales_analysis_charts.png'
+            fig.savefig(chart_path, dpi=settings['dpi'])
+            plt.close(fig)
         
         return str(chart_path)
     
-    def create_interactive_dashboard(self, sales_df, analysis):
-        """Create interactive Plotly dashboard."""
-        # Create subplots
+    def create_panel_chart(self, panel, sales_df, analysis, output_dir=None, profile=None):
+        """Render a single chart panel to ``<panel>_chart.png``."""
+        plt = _pyplot()
+        settings = self.render_profile(profile)
+        with plt.style.context(chart_style()):
+            fig, ax = plt.subplots(figsize=PANEL_FIGSIZE)
+            self.draw_chart_panel(ax, panel, sales_df, analysis)
+            fig.subplots_adjust(**PANEL_LAYOUT)
+            
+            output_dir = Path(output_dir or self.output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            panel_path = output_dir / f'{panel}_chart.png'
+            fig.savefig(panel_path, dpi=settings['panel_dpi'])
+            plt.close(fig)
+        
+        return str(panel_path)
+    
+    def create_panel_charts(self, sales_df, analysis, output_dir=None, profile=None, parallel=None):
+        """Render every chart panel to its own PNG, on the render pool when parallel.
+
+        Returns a dict mapping ``panel_<name>`` to the PNG path.
+        """
+        if parallel is None:
+            parallel = self.config.get('render', {}).get('parallel', (os.cpu_count() or 1) > 1)
+        if parallel:
+            pool = self.get_render_pool()
+            futures = {
+                panel: pool.submit(self.create_panel_chart, panel, sales_df, analysis, output_dir, profile)
+                for panel in CHART_PANELS
+            }
+            return {f'panel_{panel}': future.result() for panel, future in futures.items()}
+        return {
+            f'panel_{panel}': self.create_panel_chart(panel, sales_df, analysis, output_dir, profile)
+            for panel in CHART_PANELS
+        }
+    
+    def create_interactive_dashboard(self, sales_df, analysis, output_dir=None, title=None, options=None):
+        """Create interactive Plotly dashboard.
+
+        ``options`` override the ``dashboard`` config section:
+
+        - ``max_points``/``downsample``: reduce the daily series to at most
+          ``max_points`` with ``'lttb'`` or ``'minmax'`` (None keeps every point).
+        - ``webgl_threshold``: draw the series with ``Scattergl`` above this size.
+        - ``plotlyjs``: ``'directory'`` writes plotly.min.js once per output
+          directory, ``'cdn'`` links it, ``'inline'`` embeds it in every file.
+        """
+        import plotly.graph_objects as go
         from plotly.subplots import make_subplots
+        options = {**DASHBOARD_DEFAULTS, **self.config.get('dashboard', {}), **(options or {})}
+        customers = analysis.get('customer_analysis')
         
-        fig = make_subplots(
-            rows=2, cols=2,
-            subplot_titles=('Daily Sales Trend', 'Category Performance', 
-                          'Regional Distribution', 'Monthly Trends'),
-            specs=[[{"secondary_y": False}, {"secondary_y": False}],
-                   [{"type": "pie"}, {"secondary_y": False}]]
-        )
+        # Create subplots, with a customer analytics row when there are customers
+        titles = ['Daily Sales Trend', 'Category Performance', 'Regional Distribution', 'Monthly Trends']
+        specs = [[{"secondary_y": False}, {"secondary_y": False}],
+                 [{"type": "pie"}, {"secondary_y": False}]]
+        if customers:
+            titles += ['Customer Lifetime Value Distribution', 'Acquisition Cohorts']
+            specs.append([{"secondary_y": False}, {"secondary_y": False}])
+        fig = make_subplots(rows=len(specs), cols=2, subplot_titles=titles, specs=specs)
         
-        # Daily sales trend
+        # Daily sales trend, downsampled and WebGL-rendered when large
         daily_sales = sales_df.groupby('date')['sales_amount'].sum()
+        max_points = options['max_points']
+        if options['downsample'] and max_points and len(daily_sales) > max_points:
+            keep = DOWNSAMPLERS[options['downsample']](daily_sales.index.values, daily_sales.values, max_points)
+            daily_sales = daily_sales.iloc[keep]
+        scatter = go.Scattergl if len(daily_sales) > options['webgl_threshold'] else go.Scatter
         fig.add_trace(
-            go.Scatter(x=daily_sales.index, y=daily_sales.values, 
-                      mode='lines', name='Daily Sales', line=dict(color='#2E86AB')),
+            scatter(x=daily_sales.index, y=daily_sales.values, 
+                    mode='lines', name='Daily Sales', line=dict(color='#2E86AB')),
             row=1, col=1
         )
         
@@ -240,40 +725,91 @@ class ReportGenerator:
         months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
                  'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
         fig.add_trace(
-            go.Bar(x=months, y=monthly_data['sales_amount'].values, 
+            go.Bar(x=[months[m - 1] for m in monthly_data.index], y=monthly_data['sales_amount'].values, 
                    name='Monthly Sales', marker_color='#F18F01'),
             row=2, col=2
         )
         
-        fig.update_layout(height=800, showlegend=False, 
-                         title_text="Sales Performance Dashboard")
+        # Customer analytics
+        if customers:
+            histogram = customers['ltv_histogram']
+            fig.add_trace(
+                go.Bar(x=(histogram['bin_start'] + histogram['bin_end']) / 2, y=histogram['customers'],
+                       width=histogram['bin_end'] - histogram['bin_start'],
+                       name='Customers by LTV', marker_color='#2E86AB'),
+                row=3, col=1
+            )
+            cohorts = customers['cohorts']
+            fig.add_trace(
+                go.Bar(x=cohorts.index, y=cohorts['customers'], name='New Customers',
+                       customdata=cohorts['avg_ltv'],
+                       hovertemplate='%{x}: %{y:,} customers, avg LTV $%{customdata:,.2f}<extra></extra>',
+                       marker_color='#C73E1D'),
+                row=3, col=2
+            )
+        
+        fig.update_layout(height=400 * len(specs), showlegend=False, 
+                         title_text=title or "Sales Performance Dashboard")
         
-        dashboard_path = self.output_dir / 'interactive_dashboard.html'
-        fig.write_html(str(dashboard_path))
+        output_dir = Path(output_dir or self.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        dashboard_path = output_dir / 'interactive_dashboard.html'
+        include_plotlyjs = {'directory': 'directory', 'cdn': 'cdn', 'inline': True}[options['plotlyjs']]
+        fig.write_html(str(dashboard_path), include_plotlyjs=include_plotlyjs)
+        
+        payload = self.dashboard_payload(dashboard_path)
+        print(f"Dashboard payload: {payload['html_bytes'] / 1024:.1f} KB "
+              f"(+ {payload['plotlyjs_bytes'] / 1024:.1f} KB shared plotly.js)")
         
         return str(dashboard_path)
     
-    def generate_pdf_report(self, analysis, chart_path):
-        """Generate PDF report using ReportLab."""
-        pdf_path = self.output_dir / f'sales_report_{datetime.now().strftime("%Y%m%d")}.pdf'
-        doc = SimpleDocTemplate(str(pdf_path), pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
+    def dashboard_payload(self, dashboard_path):
+        """Return the HTML size and the size of the plotly.js bundle beside it."""
+        bundle = Path(dashboard_path).parent / PLOTLYJS_BUNDLE
+        return {
+            'html_bytes': os.path.getsize(dashboard_path),
+            'plotlyjs_bytes': os.path.getsize(bundle) if bundle.exists() else 0
+        }
+    
+    def generate_pdf_report(self, analysis, chart_path, output_dir=None, title=None, sales_df=None, tables=None):
+        """Generate PDF report using ReportLab.
+
+        The story is streamed into the document, so long detail tables are
+        laid out a page at a time. ``tables`` is a list of dicts with
+        ``title``, ``columns``, ``rows`` (any iterable, e.g. a cursor
+        generator) and optionally ``col_widths``. The ``render.pdf_tables``
+        setting appends built-in tables: ``"daily"`` a per-day table of
+        ``sales_df``, ``"customers"`` a per-customer table read from a
+        pooled SQLite connection held while the document is built.
+        """
+        output_dir = Path(output_dir or self.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        pdf_path = output_dir / f'sales_report_{datetime.now().strftime("%Y%m%d")}.pdf'
+        tables = list(tables or [])
+        pdf_tables = self.config.get('render', {}).get('pdf_tables', [])
+        if sales_df is not None and 'daily' in pdf_tables:
+            tables.append(self.daily_detail_table(sales_df))
+        with ExitStack() as stack:
+            if 'customers' in pdf_tables:
+                source = self.get_data_source()
+                conn = None if isinstance(source, ParquetDataSource) else stack.enter_context(source.connection())
+                if conn is not None and has_customers_table(conn):
+                    tables.append(self.customer_detail_table(conn))
+            build_pdf(pdf_path, self._pdf_story(analysis, chart_path, title, tables))
+        return str(pdf_path)
+    
+    def _pdf_story(self, analysis, chart_path, title, tables):
+        """Yield the flowables of the PDF report in order."""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Image, PageBreak, Paragraph, Spacer, Table
+        styles = paragraph_styles()
         
         # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            textColor=colors.HexColor('#2E86AB'),
-            alignment=1  # Center alignment
-        )
-        story.append(Paragraph("Sales Performance Report", title_style))
-        story.append(Spacer(1, 20))
+        yield Paragraph(title or "Sales Performance Report", styles['title'])
+        yield Spacer(1, 20)
         
         # Executive Summary
-        story.append(Paragraph("Executive Summary", styles['Heading2']))
+        yield Paragraph("Executive Summary", styles['heading'])
         summary_text = f"""
         This report provides a comprehensive analysis of sales performance for the current period.
         Key highlights include:
@@ -283,11 +819,11 @@ class ReportGenerator:
         • Average Order Value: ${analysis['avg_order_value']:.2f}<br/>
         • Daily Average Sales: ${analysis['daily_avg_sales']:.2f}<br/>
         """
-        story.append(Paragraph(summary_text, styles['Normal']))
-        story.append(Spacer(1, 20))
+        yield Paragraph(summary_text, styles['body'])
+        yield Spacer(1, 20)
         
         # Key Metrics Table
-        story.append(Paragraph("Key Performance Indicators", styles['Heading2']))
+        yield Paragraph("Key Performance Indicators", styles['heading'])
         
         kpi_data = [
             ['Metric', 'Value'],
@@ -298,41 +834,216 @@ class ReportGenerator:
             ['Best Sales Day', f"${analysis['best_day']['sales_amount']:.2f}"],
             ['Worst Sales Day', f"${analysis['worst_day']['sales_amount']:.2f}"]
         ]
-        
-        kpi_table = Table(kpi_data, colWidths=[3*inch, 2*inch])
-        kpi_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(kpi_table)
-        story.append(Spacer(1, 20))
+        yield Table(kpi_data, colWidths=[3*inch, 2*inch], style=table_style('kpi'))
+        yield Spacer(1, 20)
         
         # Charts
         if Path(chart_path).exists():
-            story.append(Paragraph("Performance Charts", styles['Heading2']))
-            story.append(Image(chart_path, width=6*inch, height=4.5*inch))
+            yield Paragraph("Performance Charts", styles['heading'])
+            yield Image(chart_path, width=6*inch, height=4.5*inch)
         
-        doc.build(story)
-        return str(pdf_path)
+        # Customer analytics
+        if analysis.get('customer_analysis'):
+            yield from self._customer_story(analysis['customer_analysis'])
+        
+        # Detail tables, fed to the document chunk by chunk
+        chunk_rows = self.config.get('render', {}).get('pdf_chunk_rows', 100)
+        for table in tables:
+            yield PageBreak()
+            yield Paragraph(table['title'], styles['heading'])
+            yield from long_table(table['columns'], table['rows'], table.get('col_widths'), chunk_rows)
+    
+    def _customer_story(self, customers):
+        """Yield the customer analytics section of the PDF report."""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import PageBreak, Paragraph, Spacer, Table
+        styles = paragraph_styles()
+        percentiles = customers['ltv_percentiles']
+        
+        yield PageBreak()
+        yield Paragraph("Customer Analytics", styles['heading'])
+        kpi_data = [
+            ['Metric', 'Value'],
+            ['Customers', f"{customers['customer_count']:,}"],
+            ['Total Lifetime Value', f"${customers['total_ltv']:,.2f}"],
+            ['Average Lifetime Value', f"${customers['avg_ltv']:,.2f}"],
+            ['Median Lifetime Value', f"${percentiles['p50']:,.2f}"],
+            ['90th / 99th Percentile', f"${percentiles['p90']:,.2f} / ${percentiles['p99']:,.2f}"]
+        ]
+        yield Table(kpi_data, colWidths=[3*inch, 2*inch], style=table_style('kpi'))
+        yield Spacer(1, 20)
+        
+        yield Paragraph("Lifetime Value Distribution", styles['heading'])
+        histogram = customers['ltv_histogram']
+        yield bar_chart([f"${start:,.0f}" for start in histogram['bin_start']], histogram['customers'])
+        yield Spacer(1, 20)
+        
+        sections = [
+            ("Acquisition Cohorts", 'Cohort', customers['cohorts']),
+            ("Customers by Age", 'Age', customers['by_age_band']),
+            ("Customers by Location", 'Location', customers['by_location']),
+            ("Customers by Gender", 'Gender', customers['by_gender'])
+        ]
+        for heading, label, frame in sections:
+            yield Paragraph(heading, styles['heading'])
+            rows = zip(frame.index, frame['customers'].astype(int), (frame['share'] * 100).map('{:.1f}%'.format),
+                       frame['avg_ltv'], frame['ltv_total'])
+            yield from long_table([label, 'Customers', 'Share', 'Avg LTV', 'Total LTV'], rows)
+            yield Spacer(1, 12)
+    
+    def daily_detail_table(self, sales_df):
+        """Per-day detail table for the PDF, with rows generated lazily."""
+        rows = (
+            (day.strftime('%Y-%m-%d'), sales, int(orders), int(customers))
+            for day, sales, orders, customers in zip(
+                sales_df['date'], sales_df['sales_amount'], sales_df['orders'], sales_df['customers'])
+        )
+        return {'title': "Daily Sales Detail", 'columns': ['Date', 'Sales', 'Orders', 'Customers'], 'rows': rows}
+    
+    def customer_detail_table(self, conn, batch_size=5000):
+        """Per-customer detail table for the PDF, read from ``conn`` in batches."""
+        def rows():
+            cursor = conn.execute(
+                'SELECT customer_id, age, gender, location, lifetime_value, acquisition_date '
+                'FROM customers ORDER BY customer_id'
+            )
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield from batch
+        return {
+            'title': "Customer Detail",
+            'columns': ['Customer', 'Age', 'Gender', 'Location', 'Lifetime Value', 'Acquired'],
+            'rows': rows()
+        }
+    
+    def get_render_pool(self):
+        """Return the render process pool, created on first use and kept for later runs."""
+        if self._render_pool is None:
+            settings = self.config.get('render', {})
+            self._render_pool = ProcessPoolExecutor(
+                max_workers=settings.get('max_workers') or min(3, os.cpu_count() or 1),
+                initializer=_init_render_worker
+            )
+        return self._render_pool
+    
+    def render_artifacts(self, sales_df, analysis, parallel=None, output_dir=None, title=None, recorder=None):
+        """Render the PNG charts, the Plotly dashboard and the PDF report.
+
+        With ``parallel`` (default: the ``render.parallel`` setting, or true
+        on multi-core machines) the charts and the dashboard render at the
+        same time in worker processes and the PDF starts as soon as the chart
+        PNG exists, so wall time is close to the slowest stage.
+        """
+        job = {'sales_df': sales_df, 'analysis': analysis, 'output_dir': output_dir, 'title': title}
+        return self.render_jobs([job], parallel=parallel, recorder=recorder)[0]
+    
+    def render_jobs(self, jobs, parallel=None, recorder=None):
+        """Render the artifacts of several reports, fanned out over the render pool.
+
+        Each job is a dict with ``sales_df``, ``analysis``, ``output_dir``,
+        ``title`` and optionally ``name``. Returns one artifact dict per job,
+        in order. With the ``render.panels`` setting each chart panel is also
+        saved as its own PNG (``panel_<name>`` artifacts). Every artifact is
+        measured where it is rendered (``charts``, ``dashboard``, ``pdf`` and
+        ``panel_<name>`` stages) and added to ``recorder`` if given.
+        """
+        settings = self.config.get('render', {})
+        if parallel is None:
+            parallel = settings.get('parallel', (os.cpu_count() or 1) > 1)
+        panels = CHART_PANELS if settings.get('panels', False) else []
+        trace_memory = recorder.trace_memory if recorder is not None else False
+        
+        def unwrap(measured, job):
+            result, record = measured
+            if recorder is not None:
+                recorder.add(record, **({'report': job['name']} if 'name' in job else {}))
+            return result
+        
+        if not parallel:
+            results = []
+            for job in jobs:
+                def stage(name, func, *args):
+                    return unwrap(run_stage(name, trace_memory, func, *args), job)
+                chart_path = stage('charts', self.create_visualizations,
+                                   job['sales_df'], job['analysis'], job['output_dir'])
+                results.append({
+                    'pdf_report': stage('pdf', self.generate_pdf_report, job['analysis'], chart_path,
+                                        job['output_dir'], job['title'], self._pdf_sales_df(job)),
+                    'dashboard': stage('dashboard', self.create_interactive_dashboard,
+                                       job['sales_df'], job['analysis'], job['output_dir'], job['title']),
+                    'charts': chart_path
+                })
+                for panel in panels:
+                    results[-1][f'panel_{panel}'] = stage(f'panel_{panel}', self.create_panel_chart, panel,
+                                                          job['sales_df'], job['analysis'], job['output_dir'])
+            return results
+        
+        pool = self.get_render_pool()
+        
+        def submit(name, func, *args):
+            return pool.submit(run_stage, name, trace_memory, func, *args)
+        
+        chart_futures = {
+            submit('charts', self.create_visualizations, job['sales_df'], job['analysis'], job['output_dir']): index
+            for index, job in enumerate(jobs)
+        }
+        dashboard_futures = [
+            submit('dashboard', self.create_interactive_dashboard, job['sales_df'], job['analysis'],
+                   job['output_dir'], job['title'])
+            for job in jobs
+        ]
+        panel_futures = [
+            {
+                f'panel_{panel}': submit(f'panel_{panel}', self.create_panel_chart, panel, job['sales_df'],
+                                         job['analysis'], job['output_dir'])
+                for panel in panels
+            }
+            for job in jobs
+        ]
+        # Each PDF only waits for its own chart PNG
+        results = [{} for _ in jobs]
+        pdf_futures = {}
+        for future in as_completed(chart_futures):
+            index = chart_futures[future]
+            job = jobs[index]
+            results[index]['charts'] = unwrap(future.result(), job)
+            pdf_futures[index] = submit(
+                'pdf', self.generate_pdf_report, job['analysis'], results[index]['charts'], job['output_dir'],
+                job['title'], self._pdf_sales_df(job))
+        for index, future in enumerate(dashboard_futures):
+            results[index]['dashboard'] = unwrap(future.result(), jobs[index])
+        for index, future in pdf_futures.items():
+            results[index]['pdf_report'] = unwrap(future.result(), jobs[index])
+        for index, futures in enumerate(panel_futures):
+            results[index].update({name: unwrap(future.result(), jobs[index]) for name, future in futures.items()})
+        return results
+    
+    def _pdf_sales_df(self, job):
+        # Only ship the daily frame to the PDF stage when it renders a detail table
+        if 'daily' in self.config.get('render', {}).get('pdf_tables', []):
+            return job['sales_df']
+        return None
+    
+    def get_delivery_queue(self):
+        """Return the background SMTP delivery queue, created on first use."""
+        if self._delivery_queue is None:
+            self._delivery_queue = DeliveryQueue.from_settings(self.config['email_settings'])
+        return self._delivery_queue
     
     def send_email_report(self, pdf_path, recipients):
-        """Send email with PDF report attachment."""
+        """Queue an email with the PDF report attached.
+
+        Delivery happens on the background queue over pooled SMTP sessions,
+        so report generation does not wait for the mail server. Returns a
+        Future resolving to the send latency, or None when email is not
+        configured.
+        """
         if not recipients or not self.config['email_settings']['sender_email']:
             print("Email configuration incomplete. Skipping email send.")
             return
         
-        msg = MIMEMultipart()
-        msg['From'] = self.config['email_settings']['sender_email']
-        msg['To'] = ', '.join(recipients)
-        msg['Subject'] = f"Sales Report - {datetime.now().strftime('%Y-%m-%d')}"
-        
         body = """
         Dear Team,
         
@@ -346,99 +1057,297 @@ class ReportGenerator:
         Best regards,
         Automated Report System
         """
+        msg = build_report_message(
+            self.config['email_settings']['sender_email'],
+            recipients,
+            f"Sales Report - {datetime.now().strftime('%Y-%m-%d')}",
+            body,
+            attachment_path=pdf_path
+        )
         
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Attach PDF
-        with open(pdf_path, "rb") as attachment:
-            part = MIMEBase('application', 'octet-stream')
-            part.set_payload(attachment.read())
+        def report_delivery(future):
+            if future.exception() is None:
+                print(f"Email sent successfully to {recipients}")
+            else:
+                print(f"Failed to send email: {str(future.exception())}")
         
-        encoders.encode_base64(part)
-        part.add_header(
-            'Content-Disposition',
-            f'attachment; filename= {Path(pdf_path).name}'
+        future = self.get_delivery_queue().submit(msg, recipients)
+        future.add_done_callback(report_delivery)
+        return future
+    
+    def stage_recorder(self, run):
+        """Create a ``StageRecorder`` for one pipeline run, per the ``instrumentation`` settings."""
+        return StageRecorder(run, trace_memory=self.config.get('instrumentation', {}).get('tracemalloc', False))
+    
+    def finish_recording(self, recorder):
+        """Print the stage timings, append them to the JSON lines log if configured, and summarise."""
+        for record in recorder.stages:
+            rows = f", {record['rows']} rows" if record['rows'] is not None else ''
+            print(f"  {record['stage']}: {record['wall_seconds']:.3f}s wall, {record['cpu_seconds']:.3f}s CPU{rows}")
+        jsonl_path = self.config.get('instrumentation', {}).get('jsonl_path')
+        if jsonl_path:
+            recorder.write_jsonl(jsonl_path)
+        return recorder.summary()
+    
+    def get_artifact_cache(self):
+        """Return the report artifact cache, or None when caching is disabled."""
+        settings = self.config.get('cache', {})
+        if not settings.get('enabled', True):
+            return None
+        return ArtifactCache(
+            settings.get('directory', self.state_dir / '.cache'),
+            max_entries=settings.get('max_entries', 32),
+            max_bytes=settings.get('max_mb', 512) * 1024 * 1024
         )
-        msg.attach(part)
-        
-        # Send email
-        try:
-            server = smtplib.SMTP(self.config['email_settings']['smtp_server'], 
-                                self.config['email_settings']['smtp_port'])
-            server.starttls()
-            server.login(self.config['email_settings']['sender_email'], 
-                        self.config['email_settings']['sender_password'])
-            text = msg.as_string()
-            server.sendmail(self.config['email_settings']['sender_email'], recipients, text)
-            server.quit()
-            print(f"Email sent successfully to {recipients}")
-        except Exception as e:
-            print(f"Failed to send email: {str(e)}")
+    
+    def artifact_assets(self, artifacts):
+        """Files the artifacts reference but do not list, e.g. a shared plotly.js."""
+        bundle = Path(artifacts['dashboard']).parent / PLOTLYJS_BUNDLE
+        return [str(bundle)] if bundle.exists() else []
+    
+    def cache_fingerprint(self, conn):
+        """Fingerprint of the data currently in ``conn``, shared by every report key."""
+        if isinstance(conn, ParquetDataSource):
+            return conn.fingerprint()
+        checksum = self.config.get('cache', {}).get('checksum', True)
+        fingerprint = source_fingerprint(conn, checksum=checksum)
+        fingerprint['customers'] = customer_fingerprint(conn, checksum=checksum)
+        return fingerprint
+    
+    def report_cache_key(self, fingerprint, spec):
+        """Cache key for ``spec`` over data with the given ``cache_fingerprint``."""
+        return cache_key(fingerprint, spec, self.config.get('analysis', {}), self.config.get('render', {}),
+                         self.config.get('dashboard', {}))
     
     def generate_full_report(self):
-        """Generate complete report with all components."""
+        """Generate complete report with all components.
+
+        When the source data, settings and code are unchanged since an
+        earlier run, the cached artifacts and analysis are returned instead.
+        The result includes per-stage timings under ``metrics``.
+        """
         print("Starting report generation...")
+        recorder = self.stage_recorder('full_report')
         
-        # Connect to database
-        conn = self.connect_database()
-        
-        # Generate analysis
-        analysis, sales_df = self.generate_sales_analysis(conn)
-        
-        # Create visualizations
-        chart_path = self.create_visualizations(sales_df, analysis)
+        # Borrow a pooled (read-only) connection
+        cache = self.get_artifact_cache()
+        cached = None
+        with self.get_data_source().connection() as conn:
+            if cache is not None:
+                with recorder.stage('cache_lookup'):
+                    key = self.report_cache_key(self.cache_fingerprint(conn), {'name': 'full_report'})
+                    cached = cache.get(key)
+            if cached is None:
+                # Generate analysis
+                analysis, sales_df = self.instrumented_sales_analysis(conn, recorder)
+                analysis['customer_analysis'] = self.instrumented_customer_analysis(conn, recorder)
         
-        # Create interactive dashboard
-        dashboard_path = self.create_interactive_dashboard(sales_df, analysis)
-        
-        # Generate PDF report
-        pdf_path = self.generate_pdf_report(analysis, chart_path)
+        if cached is not None:
+            print("Source data unchanged, reusing cached report.")
+            artifacts, analysis = cached['artifacts'], cached['analysis']
+        else:
+            # Render charts, interactive dashboard and PDF report
+            artifacts = self.render_artifacts(sales_df, analysis, recorder=recorder)
+            if cache is not None:
+                with recorder.stage('cache_store'):
+                    cache.put(key, artifacts, analysis, assets=self.artifact_assets(artifacts))
+        chart_path = artifacts['charts']
+        dashboard_path = artifacts['dashboard']
+        pdf_path = artifacts['pdf_report']
         
         # Send email (if configured)
         recipients = self.config['report_templates']['sales_report']['recipients']
         if recipients:
             self.send_email_report(pdf_path, recipients)
         
-        conn.close()
-        
         print(f"Report generation completed!")
         print(f"PDF Report: {pdf_path}")
         print(f"Interactive Dashboard: {dashboard_path}")
         print(f"Charts: {chart_path}")
+        metrics = self.finish_recording(recorder)
         
         return {
             'pdf_report': pdf_path,
             'dashboard': dashboard_path,
             'charts': chart_path,
-            'analysis': analysis
+            'analysis': analysis,
+            'metrics': metrics
         }
     
-    def schedule_reports(self):
-        """Schedule automated report generation."""
-        # Schedule weekly sales report
-        schedule.every().monday.at("09:00").do(self.generate_full_report)
+    def get_report_specs(self, names=None):
+        """Build report specs from ``config['report_templates']``.
+
+        A spec is the template dict plus its ``name``; an optional
+        ``segment`` such as ``{"region": "North"}`` restricts the report to
+        one product category and/or region.
+        """
+        templates = self.config.get('report_templates', {})
+        unknown = set(names or []) - set(templates)
+        if unknown:
+            raise ValueError(f"Unknown report templates: {', '.join(sorted(unknown))}")
+        return [
+            {'name': name, **template}
+            for name, template in templates.items()
+            if not names or name in names
+        ]
+    
+    def generate_batch_reports(self, specs=None, parallel=None):
+        """Generate many report variants from a single scan of the source.
+
+        The sales source is aggregated once; every spec's analysis is a
+        slice of that aggregate, and all specs are rendered together on the
+        render pool into ``<output_dir>/<name>/``. Specs with cached
+        artifacts for the current data are not rendered again. Returns a
+        dict mapping each spec name to its artifact paths and analysis, plus
+        the stage timings of the whole batch under ``metrics``.
+        """
+        specs = self.get_report_specs() if specs is None else specs
+        check_report_specs(specs)
+        print(f"Starting batch generation of {len(specs)} reports...")
+        recorder = self.stage_recorder('batch')
+        
+        analysis_settings = self.config.get('analysis', {})
+        cache = self.get_artifact_cache()
+        keys, results = {}, {}
+        with self.get_data_source().connection() as conn:
+            if cache is not None:
+                with recorder.stage('cache_lookup'):
+                    # One fingerprint scan for the whole batch
+                    fingerprint = self.cache_fingerprint(conn)
+                    for spec in specs:
+                        keys[spec['name']] = self.report_cache_key(fingerprint, spec)
+                        cached = cache.get(keys[spec['name']])
+                        if cached is not None:
+                            results[spec['name']] = {**cached['artifacts'], 'analysis': cached['analysis']}
+            pending = [spec for spec in specs if spec['name'] not in results]
+            if pending:
+                engine = self.resolve_engine(conn, analysis_settings.get('engine', 'auto'),
+                                             analysis_settings.get('chunksize'))
+                with recorder.stage('aggregate', engine=engine) as record:
+                    aggregate = self.build_sales_aggregate(conn, engine, analysis_settings.get('chunksize'))
+                    record['rows'] = aggregate.row_count
+                # Customers are not segmented by category or region, so every report shares this
+                customer_analysis = self.instrumented_customer_analysis(conn, recorder)
+        if results:
+            print(f"Reusing {len(results)} cached reports.")
         
-        # Schedule monthly financial report (every 30 days)
-        schedule.every(30).days.do(self.generate_full_report)
+        jobs, rendered_specs = [], []
+        for spec in pending:
+            with recorder.stage('analysis', report=spec['name']) as record:
+                segment_aggregate = aggregate.filter(**spec.get('segment', {}))
+                record['rows'] = len(segment_aggregate.partials)
+                if segment_aggregate.empty:
+                    print(f"No sales data for report '{spec['name']}'. Skipping.")
+                    continue
+                jobs.append({
+                    'name': spec['name'],
+                    'sales_df': segment_aggregate.daily_frame(),
+                    'analysis': {**segment_aggregate.to_analysis(), 'customer_analysis': customer_analysis},
+                    'output_dir': self.output_dir / spec['name'],
+                    'title': spec.get('title')
+                })
+            rendered_specs.append(spec)
         
-        print("Report scheduling activated. Reports will be generated automatically.")
-        print("Weekly reports: Every Monday at 9:00 AM")
-        print("Monthly reports: First day of each month")
+        rendered = self.render_jobs(jobs, parallel=parallel, recorder=recorder)
+        for spec, job, artifacts in zip(rendered_specs, jobs, rendered):
+            if cache is not None:
+                with recorder.stage('cache_store', report=spec['name']):
+                    cache.put(keys[spec['name']], artifacts, job['analysis'], assets=self.artifact_assets(artifacts))
+            results[spec['name']] = {**artifacts, 'analysis': job['analysis']}
         
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+        for spec in specs:
+            if spec['name'] in results and spec.get('recipients'):
+                self.send_email_report(results[spec['name']]['pdf_report'], spec['recipients'])
+        
+        print(f"Batch generation completed: {len(results)} reports in {self.output_dir}")
+        metrics = self.finish_recording(recorder)
+        for result in results.values():
+            result['metrics'] = metrics
+        return results
+    
+    def build_scheduler(self, clock=None):
+        """Return a ``Scheduler`` with one job per scheduled report template.
+
+        A template runs on its ``schedule`` (a cron expression such as
+        ``"0 9 1 * *"`` or ``"0 18 L * *"``) or else its ``frequency``
+        (``daily``, ``weekly``, ``monthly``). Policies and the worker count
+        come from the ``scheduler`` config section; a template may override
+        ``misfire``, ``misfire_grace`` and ``overlap``.
+        """
+        settings = {**SCHEDULER_DEFAULTS, **self.config.get('scheduler', {})}
+        scheduler = Scheduler(
+            settings.get('state_path') or self.state_dir / 'scheduler_state.json',
+            max_workers=settings['max_workers'],
+            **({'clock': clock} if clock is not None else {})
+        )
+        for spec in self.get_report_specs():
+            expression = spec.get('schedule') or spec.get('frequency')
+            if not expression:
+                continue
+            scheduler.add_job(
+                spec['name'], expression, partial(self.run_scheduled_report, spec),
+                misfire=spec.get('misfire', settings['misfire']),
+                misfire_grace=spec.get('misfire_grace', settings['misfire_grace']),
+                overlap=spec.get('overlap', settings['overlap'])
+            )
+        return scheduler
+
+    def run_scheduled_report(self, spec):
+        """Generate one scheduled report into ``<output_dir>/<name>/``.
+
+        Scheduled runs share this generator across worker threads, so
+        rendering always goes to the render process pool.
+        """
+        return self.generate_batch_reports([spec], parallel=True)
+
+    def schedule_reports(self, block=True):
+        """Run the scheduled report templates until interrupted.
 
-def main():
+        The scheduler sleeps until the next due report and runs due reports
+        concurrently; with ``block=False`` it runs in a background thread
+        and is returned.
+        """
+        scheduler = self.build_scheduler()
+        # Create the shared render pool before worker threads race for it
+        self.get_render_pool()
+        for name, status in scheduler.status().items():
+            print(f"Scheduled '{name}' ({status['schedule']}), next run at {status['next_due']}")
+        if not block:
+            return scheduler.start()
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            print("Stopping the report scheduler...")
+        finally:
+            scheduler.stop()
+        return scheduler
+
+def main(argv=None):
     """Main function to run the report generator."""
-    generator = ReportGenerator()
+    parser = argparse.ArgumentParser(description="Automated report generator")
+    parser.add_argument('--config', default='config.json', help="configuration file")
+    parser.add_argument('--batch', nargs='*', metavar='TEMPLATE',
+                        help="generate the named report templates (all if none given) in one pass")
+    parser.add_argument('--specs', help="JSON file with a list of report specs for --batch")
+    parser.add_argument('--schedule', action='store_true', help="start the report scheduler")
+    args = parser.parse_args(argv)
     
-    # Generate immediate report
-    results = generator.generate_full_report()
+    generator = ReportGenerator(args.config)
+    
+    if args.specs:
+        with open(args.specs, 'r') as f:
+            generator.generate_batch_reports(json.load(f))
+    elif args.batch is not None:
+        generator.generate_batch_reports(generator.get_report_specs(args.batch))
+    else:
+        # Generate immediate report
+        results = generator.generate_full_report()
     
     # Optionally start scheduler
-    # generator.schedule_reports()
+    if args.schedule:
+        generator.schedule_reports()
+    
+    generator.close()
 
 if __name__ == "__main__":
     main()
-
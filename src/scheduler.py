@@ -0,0 +1,362 @@
+"""
+Report scheduler.
+
+``CronExpression`` parses five-field cron expressions (minute, hour, day of
+month, month, day of week) with lists, ranges, steps, month/day names, ``L``
+for the last day of the month and the usual ``@daily``/``@weekly``/
+``@monthly`` aliases, and computes the next fire time in local time.
+
+``Scheduler`` sleeps until the earliest due job instead of polling, runs due
+jobs on a bounded thread pool and records the last run of every job in a
+JSON state file. After a restart, runs that fell due while the scheduler was
+down are handled by the job's misfire policy, and runs that already
+completed are not repeated.
+"""
+
+import calendar
+import heapq
+import json
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ALIASES = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+# Expressions for the ``frequency`` field of the report templates
+FREQUENCIES = {
+    'hourly': '0 * * * *',
+    'daily': '0 9 * * *',
+    'weekly': '0 9 * * mon',
+    'monthly': '0 9 1 * *',
+}
+
+MONTH_NAMES = {name.lower(): number for number, name in enumerate(calendar.month_abbr) if name}
+DAY_NAMES = {'sun': 0, 'mon': 1, 'tue': 2, 'wed': 3, 'thu': 4, 'fri': 5, 'sat': 6}
+
+# (name, lowest, highest, value names)
+FIELDS = [
+    ('minute', 0, 59, {}),
+    ('hour', 0, 23, {}),
+    ('day', 1, 31, {}),
+    ('month', 1, 12, MONTH_NAMES),
+    ('weekday', 0, 7, DAY_NAMES),
+]
+
+MISFIRE_POLICIES = ('run_once', 'skip')
+OVERLAP_POLICIES = ('skip', 'queue', 'allow')
+
+# Give up looking for a fire time this many years ahead (e.g. "0 0 30 2 *")
+SEARCH_YEARS = 8
+
+
+def _parse_value(value, low, high, names):
+    value = names.get(value.lower(), value)
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid cron value: {value}")
+    if not low <= number <= high:
+        raise ValueError(f"Cron value {number} is outside {low}-{high}")
+    return number
+
+
+def _parse_field(text, low, high, names):
+    """Set of the values matched by one cron field."""
+    values = set()
+    for part in text.split(','):
+        base, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(f"Invalid cron step: {part}")
+        if base == '*':
+            start, end = low, high
+        elif '-' in base:
+            start, end = (_parse_value(value, low, high, names) for value in base.split('-', 1))
+        else:
+            start = _parse_value(base, low, high, names)
+            end = high if step > 1 else start
+        if start > end:
+            raise ValueError(f"Invalid cron range: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """A parsed cron expression; ``next_after`` gives the next fire time."""
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        day = fields[2]
+        self.last_day = day.upper() == 'L'
+        parsed = [
+            set() if name == 'day' and self.last_day else _parse_field(text, low, high, names)
+            for text, (name, low, high, names) in zip(fields, FIELDS)
+        ]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # Both 0 and 7 mean Sunday
+        self.weekdays = {value % 7 for value in weekdays}
+        self.day_restricted = day != '*'
+        self.weekday_restricted = fields[4] != '*'
+
+    def __repr__(self):
+        return f'CronExpression({self.expression!r})'
+
+    def _day_matches(self, moment):
+        if self.last_day:
+            day_ok = moment.day == calendar.monthrange(moment.year, moment.month)[1]
+        else:
+            day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        # As in cron, a restricted day of month and day of week match either
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        if self.day_restricted:
+            return day_ok
+        return weekday_ok
+
+    def next_after(self, moment):
+        """First fire time strictly after ``moment`` (a naive local datetime)."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment.year + SEARCH_YEARS
+        while candidate.year <= limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+    def latest_until(self, start, moment):
+        """Latest fire time after ``start`` and at or before ``moment``, or None."""
+        latest, candidate = None, self.next_after(start)
+        while candidate <= moment:
+            latest, candidate = candidate, self.next_after(candidate)
+        return latest
+
+
+def parse_schedule(expression):
+    """``CronExpression`` for a cron expression, alias or template frequency."""
+    return CronExpression(FREQUENCIES.get(str(expression).strip().lower(), str(expression)))
+
+
+class ScheduleState:
+    """Last-run state of the scheduled jobs, persisted as JSON."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.jobs = {}
+        if self.path.exists():
+            self.jobs = json.loads(self.path.read_text()).get('jobs', {})
+
+    def get(self, name):
+        with self._lock:
+            return dict(self.jobs.get(name, {}))
+
+    def update(self, name, **fields):
+        """Merge ``fields`` into the state of ``name`` and write the file atomically."""
+        with self._lock:
+            self.jobs.setdefault(name, {}).update(fields)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+            tmp.write_text(json.dumps({'jobs': self.jobs}, indent=2, sort_keys=True))
+            os.replace(tmp, self.path)
+
+    def last_scheduled(self, name):
+        value = self.get(name).get('last_scheduled')
+        return datetime.fromisoformat(value) if value else None
+
+
+class ScheduledJob:
+    """A job with its schedule, policies and runtime bookkeeping.
+
+    Policies:
+
+    - ``misfire``: what to do with runs that fell due while the scheduler
+      was stopped or busy. ``'run_once'`` runs the latest missed occurrence
+      once; ``'skip'`` only runs it if it is at most ``misfire_grace``
+      seconds late and otherwise waits for the next occurrence.
+    - ``overlap``: what to do when a run falls due while the previous one is
+      still running. ``'skip'`` drops it, ``'queue'`` runs it as soon as the
+      previous run finishes (at most one queued run) and ``'allow'`` runs
+      both at once.
+    """
+
+    def __init__(self, name, schedule, func, misfire='run_once', overlap='skip', misfire_grace=300):
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"Unknown misfire policy: {misfire}")
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"Unknown overlap policy: {overlap}")
+        self.name = name
+        self.schedule = schedule if isinstance(schedule, CronExpression) else parse_schedule(schedule)
+        self.func = func
+        self.misfire = misfire
+        self.overlap = overlap
+        self.misfire_grace = misfire_grace
+        self.next_due = None
+        self.running = 0
+        self.queued = None
+
+
+class Scheduler:
+    """Run ``ScheduledJob``s at their due times on a bounded worker pool.
+
+    ``run_forever`` blocks until ``stop``; ``start`` runs the same loop in a
+    background thread. ``clock`` returns the current naive local datetime
+    and can be replaced in tests, together with calling ``run_pending``
+    directly.
+    """
+
+    def __init__(self, state_path, max_workers=2, clock=datetime.now):
+        self.state = ScheduleState(state_path)
+        self.max_workers = max_workers
+        self.clock = clock
+        self.jobs = {}
+        self._heap = []
+        # Reentrant: a done callback may run inline while ``run_pending`` holds it
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    def add_job(self, name, schedule, func, **policies):
+        """Register ``func`` to run on ``schedule``; returns the ``ScheduledJob``.
+
+        The first due time follows the persisted last run, so a restart
+        neither repeats a completed run nor forgets a missed one. A job
+        without state first runs at its next occurrence.
+        """
+        job = ScheduledJob(name, schedule, func, **policies)
+        last = self.state.last_scheduled(name)
+        job.next_due = job.schedule.next_after(last or self.clock())
+        with self._lock:
+            if name in self.jobs:
+                raise ValueError(f"Job already scheduled: {name}")
+            self.jobs[name] = job
+            heapq.heappush(self._heap, (job.next_due, name))
+        self._wake.set()
+        return job
+
+    def next_due(self):
+        """Earliest due time of all jobs, or None without jobs."""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='report-scheduler')
+        return self._executor
+
+    def run_pending(self, now=None):
+        """Dispatch every job that is due at ``now``; returns ``[(name, scheduled)]``."""
+        now = now or self.clock()
+        dispatched = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due, name = heapq.heappop(self._heap)
+                job = self.jobs[name]
+                # Coalesce the runs missed since ``due`` into the latest one
+                scheduled = job.schedule.latest_until(due, now) or due
+                job.next_due = job.schedule.next_after(scheduled)
+                heapq.heappush(self._heap, (job.next_due, name))
+                late = (now - scheduled).total_seconds()
+                if job.misfire == 'skip' and late > job.misfire_grace:
+                    self.state.update(name, last_scheduled=scheduled.isoformat(), last_status='missed')
+                    continue
+                if job.running and job.overlap != 'allow':
+                    if job.overlap == 'queue':
+                        job.queued = scheduled
+                    else:
+                        self.state.update(name, last_skipped=scheduled.isoformat())
+                    continue
+                self._dispatch(job, scheduled)
+                dispatched.append((name, scheduled))
+        return dispatched
+
+    def _dispatch(self, job, scheduled):
+        job.running += 1
+        future = self._pool().submit(self._run, job, scheduled)
+        future.add_done_callback(lambda _: self._finished(job))
+
+    def _run(self, job, scheduled):
+        started = self.clock()
+        self.state.update(job.name, last_started=started.isoformat())
+        try:
+            job.func()
+            fields = {'last_status': 'succeeded', 'last_error': None}
+        except Exception:
+            fields = {'last_status': 'failed', 'last_error': traceback.format_exc(limit=5)}
+            print(f"Scheduled job '{job.name}' failed:\n{fields['last_error']}")
+        # A run that did not finish (e.g. the process died) is picked up again after a restart
+        last = self.state.last_scheduled(job.name)
+        if last is None or scheduled > last:
+            fields['last_scheduled'] = scheduled.isoformat()
+        self.state.update(job.name, last_finished=self.clock().isoformat(), **fields)
+
+    def _finished(self, job):
+        with self._lock:
+            job.running -= 1
+            if job.queued is not None and not self._stopped.is_set():
+                scheduled, job.queued = job.queued, None
+                self._dispatch(job, scheduled)
+        self._wake.set()
+
+    def run_forever(self):
+        """Sleep until the next due time, dispatch due jobs, repeat until ``stop``."""
+        while not self._stopped.is_set():
+            self.run_pending()
+            due = self.next_due()
+            timeout = None if due is None else max((due - self.clock()).total_seconds(), 0)
+            # Re-check the clock at least hourly, e.g. after a DST change or suspend
+            self._wake.wait(min(timeout, 3600) if timeout is not None else None)
+            self._wake.clear()
+
+    def start(self):
+        """Run ``run_forever`` in a daemon thread."""
+        self._thread = threading.Thread(target=self.run_forever, name='report-scheduler-loop', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        """Stop the loop; with ``wait`` running jobs are allowed to finish."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def status(self):
+        """Next due time, running count and persisted state per job."""
+        with self._lock:
+            return {
+                name: {
+                    'schedule': job.schedule.expression,
+                    'next_due': job.next_due.isoformat(),
+                    'running': job.running,
+                    **self.state.get(name),
+                }
+                for name, job in self.jobs.items()
+            }
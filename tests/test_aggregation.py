@@ -0,0 +1,105 @@
+import unittest
+import tempfile
+from pathlib import Path
+import pandas as pd
+from src.aggregation import AggregateStateStore, SalesAggregate
+from src.report_generator import ReportGenerator
+
+class TestSalesAggregate(unittest.TestCase):
+    def setUp(self):
+        self.report_generator = ReportGenerator()
+        self.conn = self.report_generator.connect_database(db_path=":memory:")
+        self.sales_df = pd.read_sql_query("SELECT * FROM sales", self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def assertAnalysisEqual(self, expected, actual):
+        for key in ("total_sales", "avg_order_value", "daily_avg_sales"):
+            self.assertAlmostEqual(expected[key], actual[key], places=6)
+        self.assertEqual(expected["total_orders"], actual["total_orders"])
+        for key in ("best_day", "worst_day"):
+            self.assertEqual(expected[key]["date"], actual[key]["date"])
+            self.assertAlmostEqual(expected[key]["sales_amount"], actual[key]["sales_amount"])
+        pd.testing.assert_frame_equal(expected["monthly_trends"], actual["monthly_trends"], check_dtype=False)
+        for key in ("category_performance", "regional_performance"):
+            pd.testing.assert_series_equal(expected[key], actual[key], check_dtype=False)
+
+    def test_sql_engine_matches_pandas_engine(self):
+        expected, _ = self.report_generator.generate_sales_analysis(self.conn, engine="pandas")
+        actual, daily_df = self.report_generator.generate_sales_analysis(self.conn, engine="sql")
+        self.assertAnalysisEqual(expected, actual)
+        self.assertEqual(len(daily_df), self.sales_df["date"].nunique())
+
+    def test_stream_engine_matches_pandas_engine(self):
+        expected, _ = self.report_generator.generate_sales_analysis(self.conn, engine="pandas")
+        actual, daily_df = self.report_generator.generate_sales_analysis(self.conn, engine="stream", chunksize=37)
+        self.assertAnalysisEqual(expected, actual)
+        self.assertEqual(list(daily_df.columns), ["date", "sales_amount", "orders", "customers"])
+
+    def test_merged_chunks_match_single_pass(self):
+        expected = SalesAggregate.from_frame(self.sales_df).to_analysis()
+        merged = SalesAggregate()
+        for start in range(0, len(self.sales_df), 50):
+            merged = merged.merge(SalesAggregate.from_frame(self.sales_df.iloc[start:start + 50]))
+        self.assertEqual(merged.row_count, len(self.sales_df))
+        self.assertAnalysisEqual(expected, merged.to_analysis())
+
+    def test_incremental_engine_folds_new_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = Path(tmp) / "state.db"
+            conn = self.report_generator.connect_database(db_path=str(Path(tmp) / "sales.db"))
+            first = self.report_generator.incremental_sales_aggregate(conn, state_path=state_path).to_analysis()
+            self.assertAnalysisEqual(self.report_generator.generate_sales_analysis(conn, engine="pandas")[0], first)
+
+            new_rows = [("2024-12-31", 5000.0, 90, 40, "Books", "North"),
+                        ("2025-01-01", 10.0, 1, 1, "Home", "South")]
+            conn.executemany("INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?)", new_rows)
+            conn.commit()
+            aggregate = self.report_generator.incremental_sales_aggregate(conn, state_path=state_path)
+            second, daily_df = aggregate.to_analysis(), aggregate.daily_frame()
+            expected, _ = self.report_generator.generate_sales_analysis(conn, engine="pandas")
+            self.assertAnalysisEqual(expected, second)
+            self.assertEqual(second["best_day"]["sales_amount"], 5000.0)
+            self.assertEqual(daily_df["date"].max(), pd.Timestamp("2025-01-01"))
+
+            source = conn.execute("PRAGMA database_list").fetchone()[2]
+            _, watermark = AggregateStateStore(state_path).load(source)
+            self.assertEqual(watermark, "2025-01-01")
+            conn.close()
+
+    def test_incremental_engine_rebuilds_when_history_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = Path(tmp) / "state.db"
+            conn = self.report_generator.connect_database(db_path=str(Path(tmp) / "sales.db"))
+            self.report_generator.incremental_sales_aggregate(conn, state_path=state_path)
+            for change in ("DELETE FROM sales WHERE date < '2024-03-01'",
+                           "UPDATE sales SET sales_amount = sales_amount * 2 WHERE date = '2024-06-01'"):
+                conn.execute(change)
+                conn.commit()
+                actual = self.report_generator.incremental_sales_aggregate(conn, state_path=state_path).to_analysis()
+                expected, _ = self.report_generator.generate_sales_analysis(conn, engine="pandas")
+                self.assertAnalysisEqual(expected, actual)
+            conn.close()
+
+    def test_incremental_engine_keeps_no_state_for_in_memory_sources(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            state_path = Path(tmp) / "state.db"
+            self.report_generator.incremental_sales_aggregate(self.conn, state_path=state_path)
+            other = self.report_generator.connect_database(db_path=":memory:")
+            other.execute("DELETE FROM sales WHERE region = 'North'")
+            actual = self.report_generator.incremental_sales_aggregate(other, state_path=state_path).to_analysis()
+            expected, _ = self.report_generator.generate_sales_analysis(other, engine="pandas")
+            self.assertAnalysisEqual(expected, actual)
+            self.assertFalse(state_path.exists())
+            other.close()
+
+    def test_filter_by_segment(self):
+        aggregate = SalesAggregate.from_sql(self.conn).filter(region="North")
+        north = self.sales_df[self.sales_df["region"] == "North"]
+        analysis = aggregate.to_analysis()
+        self.assertAlmostEqual(analysis["total_sales"], north["sales_amount"].sum())
+        self.assertEqual(analysis["best_day"]["region"], "North")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import threading
+import time
+from src.analytics_cache import AnalyticsCache, payload_etag
+
+class TestAnalyticsCache(unittest.TestCase):
+    def test_lru_ttl_and_invalidation(self):
+        cache = AnalyticsCache(max_entries=2, ttl=0.2)
+        etag, payload = cache.put({"region": "North"}, {"total": 1})
+        self.assertEqual(etag, payload_etag({"total": 1}))
+        cache.put({"region": "South"}, {"total": 2})
+        self.assertIsNotNone(cache.get({"region": "North"}))
+        cache.put({"region": "East"}, {"total": 3})
+        self.assertIsNone(cache.get({"region": "South"}))
+        self.assertEqual(cache.get({"region": "North"}), (etag, {"total": 1}))
+        cache.invalidate()
+        self.assertIsNone(cache.get({"region": "North"}))
+        cache.put({}, {"total": 4})
+        time.sleep(0.25)
+        self.assertIsNone(cache.get({}))
+
+    def test_concurrent_misses_compute_once(self):
+        cache = AnalyticsCache()
+        calls = []
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"total": len(calls)}
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute({}, compute)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({etag for etag, _ in results}, {payload_etag({"total": 1})})
+
+    def test_result_computed_before_invalidation_is_not_stored(self):
+        cache = AnalyticsCache()
+        def compute():
+            cache.invalidate()
+            return {"total": 1}
+        self.assertEqual(cache.get_or_compute({}, compute)[1], {"total": 1})
+        self.assertIsNone(cache.get({}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import io
+import json
+import sqlite3
+import os
+import tempfile
+import time
+from src import app as app_module
+from src.artifact_cache import ArtifactCache
+
+class TestReportJobAPI(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        config_file = os.path.join(self.tmp.name, "config.json")
+        with open(config_file, "w") as f:
+            json.dump({
+                "output_directory": os.path.join(self.tmp.name, "reports"),
+                "data_source": {"path": os.path.join(self.tmp.name, "sales.db")},
+                "render": {"profile": "draft"},
+                "email_settings": {"smtp_server": "localhost", "smtp_port": 25, "sender_email": ""},
+                "report_templates": {
+                    "sales_report": {"title": "Sales", "recipients": []},
+                    "north": {"title": "North", "recipients": [], "segment": {"region": "North"}}
+                }
+            }, f)
+        app_module.app.config.update(REPORT_CONFIG=config_file, REPORT_WORKERS=1, REPORT_MAX_PENDING=2)
+        app_module._job_manager = None
+        app_module._report_generator = None
+        app_module._analytics_cache = None
+        self.db_path = os.path.join(self.tmp.name, "sales.db")
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.get_job_manager().shutdown()
+        app_module._job_manager = None
+        if app_module._report_generator is not None:
+            app_module._report_generator.close()
+            app_module._report_generator = None
+        self.tmp.cleanup()
+
+    def wait_for(self, job_id, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.client.get(f"/api/reports/{job_id}").get_json()
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            time.sleep(0.2)
+        self.fail("job did not finish")
+
+    def test_submit_poll_and_download(self):
+        response = self.client.post("/api/reports", json={"type": "batch", "templates": ["north"]})
+        self.assertEqual(response.status_code, 202)
+        job = self.wait_for(response.get_json()["job_id"])
+        self.assertEqual(job["status"], "succeeded", job.get("error"))
+        self.assertEqual(list(job["summary"]["north"]["regional_performance"]), ["North"])
+        self.assertNotIn("north/metrics", job["artifacts"])
+        self.assertIn(os.path.join("reports", "jobs", job["id"], "north"), job["artifacts"]["north/pdf_report"])
+        self.assertIn("pdf", [record["stage"] for record in job["metrics"]["stages"]])
+        download = self.client.get(f"/api/reports/{job['id']}/artifacts/north/pdf_report")
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(download.data.startswith(b"%PDF"))
+        download.close()
+        self.assertEqual(self.client.get(f"/api/reports/{job['id']}/artifacts/missing").status_code, 404)
+
+    def test_cached_artifacts_survive_cache_eviction(self):
+        first = self.wait_for(self.client.post("/api/reports", json={"type": "full"}).get_json()["job_id"])
+        second = self.wait_for(self.client.post("/api/reports", json={"type": "full"}).get_json()["job_id"])
+        self.assertEqual(second["status"], "succeeded", second.get("error"))
+        self.assertIn(os.path.join("jobs", second["id"]), second["artifacts"]["pdf_report"])
+        ArtifactCache(os.path.join(self.tmp.name, "reports", ".cache")).clear()
+        for job in (first, second):
+            download = self.client.get(f"/api/reports/{job['id']}/artifacts/pdf_report")
+            self.assertEqual(download.status_code, 200)
+            download.close()
+        os.remove(second["artifacts"]["pdf_report"])
+        self.assertEqual(self.client.get(f"/api/reports/{second['id']}/artifacts/pdf_report").status_code, 410)
+
+    def test_backpressure_and_validation(self):
+        self.assertEqual(self.client.post("/api/reports", json={"type": "weekly"}).status_code, 400)
+        for name in ("../escaped", "/tmp/absolute", "a/b", ".."):
+            response = self.client.post("/api/reports", json={"type": "batch", "specs": [{"name": name}]})
+            self.assertEqual(response.status_code, 400, name)
+        self.assertEqual(self.client.post("/api/reports", json={"type": "batch", "specs": "north"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/reports/unknown").status_code, 404)
+        responses = [self.client.post("/api/reports", json={"type": "full"}) for _ in range(3)]
+        self.assertEqual([r.status_code for r in responses], [202, 202, 429])
+        self.assertIn("Retry-After", responses[2].headers)
+        for response in responses[:2]:
+            self.wait_for(response.get_json()["job_id"])
+
+    def test_upload_streams_rows_into_the_report_database(self):
+        csv = "date,sales_amount,orders,customers,product_category,region\n" + "".join(
+            f"2024-03-{day:02d},{day}.25,{day},2,Sports,West\n" for day in range(1, 31)
+        )
+        response = self.client.post("/api/upload", data={"file": (io.BytesIO(csv.encode()), "march.csv")})
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()["rows"], 30)
+        self.assertIn("rows_per_second", response.get_json())
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*), MAX(date) FROM sales").fetchone(), (30, "2024-03-30"))
+        conn.close()
+        bad = self.client.post("/api/upload", data={"file": (io.BytesIO(b"date,region\nnot-a-date,West\n"), "bad.csv")})
+        self.assertEqual(bad.status_code, 400)
+        unsupported = self.client.post("/api/upload", data={"file": (io.BytesIO(b"{}"), "rows.json")})
+        self.assertEqual(unsupported.status_code, 400)
+
+    def test_analytics_filters_etag_and_invalidation(self):
+        response = self.client.get("/api/analytics")
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()["analytics_results"]
+        self.assertIn("best_day", results)
+        self.assertEqual(len(results["monthly_trends"]), 12)
+        etag = response.headers["ETag"]
+        cached = self.client.get("/api/analytics", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(app_module.get_analytics_cache().metrics()["hits"], 1)
+        metrics = self.client.get("/api/metrics")
+        self.assertTrue(metrics.content_type.startswith("text/plain"))
+        self.assertIn('report_stage_runs_total{stage="analytics_query"}', metrics.get_data(as_text=True))
+        self.assertIn("analytics_cache_hits 1", metrics.get_data(as_text=True))
+
+        north = self.client.get("/api/analytics?region=North&start_date=2024-03-01&end_date=2024-03-31")
+        north = north.get_json()["analytics_results"]
+        self.assertEqual(list(north["regional_performance"]), ["North"])
+        self.assertEqual([m["month"] for m in north["monthly_trends"]], [3])
+        self.assertEqual(self.client.get("/api/analytics?start_date=03/01/2024").status_code, 400)
+        self.assertEqual(self.client.get("/api/analytics?region=Atlantis").status_code, 404)
+
+        csv = "date,sales_amount,orders,customers,product_category,region\n2024-12-31,99999.0,1,1,Books,North\n"
+        self.client.post("/api/upload", data={"file": (io.BytesIO(csv.encode()), "extra.csv")})
+        refreshed = self.client.get("/api/analytics", headers={"If-None-Match": etag})
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(refreshed.get_json()["analytics_results"]["best_day"]["sales_amount"], 99999.0)
+
+if __name__ == '__main__':
+    unittest.main()
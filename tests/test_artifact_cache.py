@@ -0,0 +1,101 @@
+import unittest
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+from src.artifact_cache import ArtifactCache, cache_key
+from src.report_generator import ReportGenerator
+
+class TestArtifactCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_artifact(self, name, size=10):
+        path = self.root / name
+        path.write_bytes(b"x" * size)
+        return str(path)
+
+    def test_put_and_get(self):
+        cache = ArtifactCache(self.root / "cache")
+        key = cache_key({"rows": 10}, {"name": "report"})
+        self.assertIsNone(cache.get(key))
+        cache.put(key, {"pdf_report": self.make_artifact("report.pdf")}, {"total_sales": 1.0})
+        cached = cache.get(key)
+        self.assertEqual(cached["analysis"], {"total_sales": 1.0})
+        self.assertTrue(os.path.exists(cached["artifacts"]["pdf_report"]))
+        self.assertNotEqual(key, cache_key({"rows": 11}, {"name": "report"}))
+
+    def test_entries_do_not_follow_overwritten_outputs(self):
+        cache = ArtifactCache(self.root / "cache")
+        path = self.make_artifact("charts.png", size=10)
+        cache.put("print", {"charts": path}, {})
+        # Renderers truncate and rewrite the same file
+        with open(path, "wb") as f:
+            f.write(b"y" * 3)
+        self.assertEqual(Path(cache.get("print")["artifacts"]["charts"]).read_bytes(), b"x" * 10)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ArtifactCache(self.root / "cache", max_entries=2)
+        for key in ("a", "b"):
+            cache.put(key, {"charts": self.make_artifact(f"{key}.png")}, {})
+        old = time.time() - 60
+        os.utime(self.root / "cache" / "a" / "manifest.json", (old, old))
+        os.utime(self.root / "cache" / "b" / "manifest.json", (old - 60, old - 60))
+        cache.get("b")
+        cache.put("c", {"charts": self.make_artifact("c.png")}, {})
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("b"))
+
+        small = ArtifactCache(self.root / "small", max_bytes=1000)
+        small.put("big", {"charts": self.make_artifact("big.png", size=2000)}, {})
+        self.assertEqual(small.entries(), [])
+
+    def test_full_report_reuses_cached_artifacts(self):
+        generator = ReportGenerator()
+        generator.output_dir = generator.state_dir = self.root / "reports"
+        generator.config["data_source"] = {"path": str(self.root / "sales.db")}
+        generator.config["render"] = {"parallel": False}
+        first = generator.generate_full_report()
+        second = generator.generate_full_report()
+        self.assertIn(".cache", second["pdf_report"])
+        self.assertAlmostEqual(first["analysis"]["total_sales"], second["analysis"]["total_sales"])
+
+        with generator.get_data_source().connect(read_only=False) as conn:
+            conn.execute("UPDATE sales SET sales_amount = sales_amount + 1 WHERE rowid = 1")
+        conn.close()
+        third = generator.generate_full_report()
+        self.assertNotIn(".cache", third["pdf_report"])
+
+        # Moving a row to another region keeps every total but must still miss
+        self.assertIn(".cache", generator.generate_full_report()["pdf_report"])
+        with generator.get_data_source().connect(read_only=False) as conn:
+            conn.execute("UPDATE sales SET region = CASE region WHEN 'North' THEN 'South' ELSE 'North' END "
+                         "WHERE rowid = 1")
+        conn.close()
+        fourth = generator.generate_full_report()
+        self.assertNotIn(".cache", fourth["pdf_report"])
+        generator.close()
+
+    def test_key_covers_dashboard_settings(self):
+        generator = ReportGenerator()
+        key = generator.report_cache_key({"rows": 10}, {"name": "report"})
+        generator.config["dashboard"] = {**generator.config.get("dashboard", {}), "max_points": 10}
+        self.assertNotEqual(key, generator.report_cache_key({"rows": 10}, {"name": "report"}))
+
+    def test_batch_fingerprints_the_source_once(self):
+        generator = ReportGenerator()
+        generator.output_dir = generator.state_dir = self.root / "reports"
+        generator.config["data_source"] = {"path": str(self.root / "sales.db")}
+        specs = [{"name": f"empty_{i}", "segment": {"region": "Atlantis"}} for i in range(3)]
+        with mock.patch.object(generator, "cache_fingerprint", wraps=generator.cache_fingerprint) as fingerprint:
+            generator.generate_batch_reports(specs, parallel=False)
+        generator.close()
+        self.assertEqual(fingerprint.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import json
+import tempfile
+from pathlib import Path
+from src.benchmark import (STAGES, compare_results, main, parse_scale, run_benchmark, run_pdf_benchmark,
+                           save_baseline)
+
+class TestBenchmark(unittest.TestCase):
+    def test_parse_scale(self):
+        self.assertEqual([parse_scale(s) for s in ("10k", "1m", "10M", "2500")], [10_000, 1_000_000, 10_000_000, 2500])
+        with self.assertRaises(ValueError):
+            parse_scale("lots")
+
+    def test_compare_results_applies_threshold_and_noise_floor(self):
+        baseline = {"10k": {"generate_sales_analysis": 1.0, "create_visualizations": 0.01}}
+        results = {"10k": {"generate_sales_analysis": 1.3, "create_visualizations": 0.03, "new_stage": 5.0}}
+        regressions = compare_results(results, baseline, threshold=0.25, min_delta=0.05)
+        self.assertEqual([(r["stage"], r["ratio"]) for r in regressions], [("generate_sales_analysis", 1.3)])
+        self.assertEqual(compare_results(results, baseline, threshold=0.5), [])
+
+    def test_run_and_gate_against_baseline(self):
+        timings = run_benchmark(2000, profile="draft")
+        self.assertEqual(list(timings), STAGES)
+        self.assertTrue(all(seconds > 0 for seconds in timings.values()))
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = Path(tmp) / "baseline.json"
+            save_baseline(baseline, {"2000": {stage: 1e-6 for stage in STAGES}})
+            self.assertIn("machine", json.loads(baseline.read_text()))
+            args = ["--scales", "2000", "--profile", "draft", "--baseline", str(baseline)]
+            self.assertEqual(main(args + ["--min-delta", "0"]), 1)
+            self.assertEqual(main(args + ["--min-delta", "60"]), 0)
+
+    def test_pdf_benchmark_reports_pages_per_second(self):
+        result = run_pdf_benchmark(500)
+        self.assertGreater(result["pages"], 5)
+        self.assertGreater(result["pages_per_second"], 0)
+        self.assertGreater(result["tracemalloc_peak_bytes"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+from src.customer_analysis import (AGE_BANDS, FINE_BINS, CustomerAggregate, customer_analysis_to_dict,
+                                   customer_fingerprint)
+from src.report_generator import ReportGenerator
+
+class TestCustomerAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.report_generator = ReportGenerator()
+        self.conn = sqlite3.connect(":memory:")
+        self.report_generator.create_sample_data(self.conn, n_customers=20_000, seed=3)
+        self.customers = pd.read_sql_query("SELECT * FROM customers", self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_sql_and_frame_aggregates_agree(self):
+        from_sql = CustomerAggregate.from_sql(self.conn)
+        from_frame = CustomerAggregate.from_frame(self.customers)
+        self.assertEqual(from_sql.ltv_range, from_frame.ltv_range)
+        self.assertEqual(from_sql.bins.tolist(), from_frame.bins.tolist())
+        analysis, expected = from_sql.to_analysis(), from_frame.to_analysis()
+        for key in ("cohorts", "by_age_band", "by_gender", "by_location"):
+            pd.testing.assert_frame_equal(analysis[key], expected[key], check_dtype=False)
+        self.assertEqual(list(analysis["by_age_band"].index), AGE_BANDS)
+
+    def test_percentiles_histogram_and_cohorts(self):
+        analysis = CustomerAggregate.from_sql(self.conn).to_analysis()
+        ltv = self.customers["lifetime_value"]
+        bin_width = (ltv.max() - ltv.min()) / FINE_BINS
+        expected = np.percentile(ltv, [10, 25, 50, 75, 90, 95, 99])
+        np.testing.assert_allclose(analysis["ltv_percentiles"].values, expected, atol=bin_width)
+        self.assertEqual(analysis["ltv_histogram"]["customers"].sum(), 20_000)
+        self.assertAlmostEqual(analysis["total_ltv"], ltv.sum(), places=2)
+        cohorts = analysis["cohorts"]
+        self.assertEqual(cohorts["cumulative_customers"].iloc[-1], 20_000)
+        self.assertEqual(cohorts.index.tolist(), sorted(self.customers["acquisition_date"].str[:7].unique()))
+        self.assertAlmostEqual(cohorts["share"].sum(), 1.0)
+        json.dumps(customer_analysis_to_dict(analysis))
+
+    def test_chunk_aggregates_combine(self):
+        full = CustomerAggregate.from_frame(self.customers)
+        chunks = [CustomerAggregate.from_frame(self.customers.iloc[start:start + 6000], full.ltv_range)
+                  for start in range(0, 20_000, 6000)]
+        combined = CustomerAggregate.combine(chunks)
+        self.assertEqual(combined.bins.tolist(), full.bins.tolist())
+        pd.testing.assert_series_equal(combined.percentiles(), full.percentiles())
+        with self.assertRaises(ValueError):
+            CustomerAggregate.combine([chunks[0], CustomerAggregate.from_frame(self.customers.iloc[:10])])
+
+    def test_missing_customers_table(self):
+        self.conn.execute("DROP TABLE customers")
+        self.assertTrue(CustomerAggregate.from_sql(self.conn).empty)
+        self.assertIsNone(customer_fingerprint(self.conn))
+        self.assertIsNone(self.report_generator.generate_customer_analysis(self.conn))
+
+if __name__ == '__main__':
+    unittest.main()
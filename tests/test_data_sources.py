@@ -0,0 +1,99 @@
+import unittest
+import io
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from src.data_sources import SQLiteDataSource, ingest_sales, read_sales_chunks
+from src.report_generator import ReportGenerator
+
+class TestSQLiteDataSource(unittest.TestCase):
+    def setUp(self):
+        self.report_generator = ReportGenerator()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / "reports.db"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def seed_count(self):
+        calls = []
+        def seed(conn):
+            calls.append(conn)
+            self.report_generator.create_sample_data(conn, seed=1)
+        return calls, seed
+
+    def test_auto_mode_seeds_only_once(self):
+        calls, seed = self.seed_count()
+        SQLiteDataSource(self.db_path, seed=seed).prepare()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM sales WHERE date > '2024-06-30'")
+        conn.close()
+        source = SQLiteDataSource(self.db_path, seed=seed)
+        schema = source.prepare()
+        self.assertEqual(len(calls), 1)
+        self.assertIn("customers", schema)
+        with source.connection() as conn:
+            self.assertEqual(conn.execute("SELECT MAX(date) FROM sales").fetchone(), ("2024-06-30",))
+        source.close()
+
+    def test_attach_mode_requires_schema(self):
+        with self.assertRaises(ValueError):
+            SQLiteDataSource(self.db_path, mode="attach").prepare()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE sales (date TEXT, sales_amount REAL)")
+        conn.close()
+        with self.assertRaisesRegex(ValueError, "orders"):
+            SQLiteDataSource(self.db_path, mode="attach").prepare()
+
+    def test_pooled_connections_are_read_only_and_reused(self):
+        source = self.report_generator.get_data_source(self.db_path)
+        self.assertIs(source, self.report_generator.get_data_source(self.db_path))
+        with source.connection() as conn:
+            first = conn
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM sales")
+        with source.connection() as conn:
+            self.assertIs(conn, first)
+        self.report_generator.close()
+
+    def test_streaming_ingest_is_validated_and_transactional(self):
+        rows = "".join(f"2024-01-{day:02d},{day * 10.5},{day},1,Books,North\n" for day in range(1, 21))
+        header = "date,sales_amount,orders,customers,product_category,region\n"
+        source = SQLiteDataSource(self.db_path)
+        with source.writer() as conn:
+            stats = ingest_sales(conn, read_sales_chunks(io.StringIO(header + rows), "csv", chunksize=6))
+        self.assertEqual(stats["rows"], 20)
+        bad = header + rows + "2024-01-21,12.0,1.5,1,Books,North\n"
+        with source.writer() as conn:
+            with self.assertRaisesRegex(ValueError, "Row 21 has an invalid orders"):
+                ingest_sales(conn, read_sales_chunks(io.StringIO(bad), "csv", chunksize=6))
+        no_region = io.StringIO("date,sales_amount,orders,customers,product_category\n2024-02-01,1.0,1,1,Books\n")
+        with source.writer() as conn:
+            with self.assertRaisesRegex(ValueError, "missing columns: region"):
+                ingest_sales(conn, read_sales_chunks(no_region, "csv"))
+        with SQLiteDataSource(self.db_path, mode="attach").connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*), SUM(orders) FROM sales").fetchone(), (20, 210))
+
+    def test_readers_are_not_blocked_by_a_running_ingest(self):
+        source = self.report_generator.get_data_source(self.db_path)
+        source.prepare()
+        counts = []
+        def read():
+            with source.connection() as conn:
+                counts.append(conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0])
+        with source.writer() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+            conn.execute("INSERT INTO sales SELECT * FROM sales")
+            reader = threading.Thread(target=read)
+            reader.start()
+            reader.join(5)
+            self.assertFalse(reader.is_alive())
+            conn.commit()
+        # The reader saw the last committed data
+        self.assertEqual(counts, [before])
+        self.report_generator.close()
+
+if __name__ == '__main__':
+    unittest.main()
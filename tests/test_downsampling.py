@@ -0,0 +1,30 @@
+import unittest
+import numpy as np
+from src.downsampling import lttb, minmax
+
+class TestDownsampling(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = np.arange(np.datetime64("2015-01-01"), np.datetime64("2024-12-31"))
+        self.y = rng.normal(1000, 150, len(self.x))
+        self.y[1234] = 5000
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        keep = lttb(self.x, self.y, 500)
+        self.assertEqual(len(keep), 500)
+        self.assertEqual((keep[0], keep[-1]), (0, len(self.y) - 1))
+        self.assertTrue(np.all(np.diff(keep) > 0))
+        self.assertIn(1234, keep)
+
+    def test_minmax_keeps_bucket_extremes(self):
+        keep = minmax(self.x, self.y, 500)
+        self.assertLessEqual(len(keep), 500)
+        self.assertIn(int(self.y.argmax()), keep)
+        self.assertIn(int(self.y.argmin()), keep)
+
+    def test_short_series_is_untouched(self):
+        np.testing.assert_array_equal(lttb(self.x[:10], self.y[:10], 50), np.arange(10))
+        np.testing.assert_array_equal(minmax(self.x[:10], self.y[:10], 50), np.arange(10))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["numpy", "pandas", "matplotlib", "plotly", "reportlab", "schedule", "pyarrow"]
+# Seconds; the eager imports used to take well over a second
+IMPORT_BUDGET = float(os.environ.get("IMPORT_BUDGET_SECONDS", "1.0"))
+
+def cold_import(module):
+    """Import ``module`` in a fresh interpreter; returns (seconds, heavy modules loaded)."""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps([elapsed, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+class TestImportTime(unittest.TestCase):
+    def test_entry_points_import_without_heavy_backends(self):
+        for module in ("src.report_generator", "src.app", "src.jobs"):
+            with self.subTest(module=module):
+                elapsed, heavy = cold_import(module)
+                self.assertEqual(heavy, [])
+                self.assertLess(elapsed, IMPORT_BUDGET)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import json
+import tempfile
+import time
+from pathlib import Path
+from src.instrumentation import MetricsRegistry, StageRecorder, measure, run_stage
+
+class TestInstrumentation(unittest.TestCase):
+    def test_measure_records_time_and_memory(self):
+        with measure("load", trace_memory=True) as record:
+            data = [0] * 1_000_000
+            record["rows"] = len(data)
+            time.sleep(0.05)
+        self.assertGreaterEqual(record["wall_seconds"], 0.05)
+        self.assertLess(record["cpu_seconds"], record["wall_seconds"])
+        self.assertGreater(record["tracemalloc_peak_bytes"], 8_000_000)
+        self.assertGreaterEqual(record["peak_rss_increase_bytes"], 0)
+        self.assertEqual(record["rows"], 1_000_000)
+        result, record = run_stage("sum", False, sum, [1, 2, 3])
+        self.assertEqual((result, record["stage"]), (6, "sum"))
+        self.assertNotIn("tracemalloc_peak_bytes", record)
+
+    def test_recorder_feeds_registry_and_jsonl(self):
+        registry = MetricsRegistry()
+        recorder = StageRecorder("full_report", registry=registry)
+        for _ in range(2):
+            with recorder.stage("aggregate", engine="sql") as record:
+                record["rows"] = 10
+        recorder.add(run_stage("pdf", False, len, "x")[1], report='a "quoted" name')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "logs" / "stages.jsonl"
+            recorder.write_jsonl(path)
+            lines = [json.loads(line) for line in path.read_text().splitlines()]
+        self.assertEqual([line["stage"] for line in lines], ["aggregate", "aggregate", "pdf"])
+        self.assertEqual(lines[0]["engine"], "sql")
+        self.assertEqual(recorder.summary()["run"], "full_report")
+        text = registry.render_prometheus({"report_jobs_pending": ("Pending jobs.", 3)})
+        self.assertIn('report_stage_runs_total{stage="aggregate"} 2', text)
+        self.assertIn('report_stage_rows_total{stage="aggregate"} 20', text)
+        self.assertIn("# TYPE report_stage_wall_seconds_total counter", text)
+        self.assertIn("report_jobs_pending 3", text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import socketserver
+import tempfile
+import threading
+from pathlib import Path
+from src.mailer import DeliveryQueue, build_report_message
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Tiny in-process SMTP stand-in recording every message it accepts."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, fail_first=0):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost ready")
+        recipients = []
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command.startswith("MAIL"):
+                with server.lock:
+                    refuse = server.fail_first > 0
+                    server.fail_first -= refuse
+                self.reply("451 try again later" if refuse else "250 OK")
+                recipients = []
+            elif command.startswith("RCPT"):
+                if "UNKNOWN@" in command:
+                    self.reply("550 no such user")
+                    continue
+                recipients.append(command)
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 end with .")
+                data = b"".join(iter(self.rfile.readline, b".\r\n"))
+                with server.lock:
+                    server.messages.append((recipients, data))
+                self.reply("250 queued")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("250 OK")
+
+class TestDeliveryQueue(unittest.TestCase):
+    def start_queue(self, server, **options):
+        host, port = server.server_address
+        return DeliveryQueue(host, port, sender_email="reports@example.com", use_tls=False,
+                             backoff=0.01, **options)
+
+    def test_batched_sends_reuse_one_session(self):
+        server = LocalSMTPServer()
+        delivery = self.start_queue(server, workers=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = Path(tmp) / "report.pdf"
+            pdf_path.write_bytes(b"%PDF-1.4 sample")
+            futures = [
+                delivery.submit(build_report_message("reports@example.com", [f"user{i}@example.com"],
+                                                     "Sales Report", "Attached.", pdf_path),
+                                [f"user{i}@example.com"])
+                for i in range(10)
+            ]
+            delivery.stop()
+        for future in futures:
+            self.assertGreaterEqual(future.result(timeout=5), 0)
+        self.assertEqual(len(server.messages), 10)
+        self.assertEqual(server.connections, 1)
+        metrics = delivery.metrics()
+        self.assertEqual((metrics["sent"], metrics["failed"], metrics["connections"]), (10, 0, 1))
+        self.assertIn("latency_p95", metrics)
+        server.shutdown()
+        server.server_close()
+
+    def test_retries_with_backoff_then_fails(self):
+        server = LocalSMTPServer(fail_first=2)
+        delivery = self.start_queue(server, workers=1, max_retries=2)
+        msg = build_report_message("reports@example.com", ["a@example.com"], "Report", "Body")
+        self.assertGreaterEqual(delivery.submit(msg, ["a@example.com"]).result(timeout=5), 0)
+        self.assertEqual(delivery.metrics()["retries"], 2)
+
+        server.fail_first = 10
+        failed = delivery.submit(msg, ["a@example.com"])
+        self.assertIsNotNone(failed.exception(timeout=5))
+        delivery.stop()
+        self.assertEqual(delivery.metrics()["failed"], 1)
+        server.shutdown()
+        server.server_close()
+
+    def test_permanent_rejection_fails_without_retry_or_reconnect(self):
+        server = LocalSMTPServer()
+        delivery = self.start_queue(server, workers=1)
+        msg = build_report_message("reports@example.com", ["unknown@example.com"], "Report", "Body")
+        rejected = delivery.submit(msg, ["unknown@example.com"])
+        delivered = delivery.submit(msg, ["a@example.com"])
+        self.assertIsNotNone(rejected.exception(timeout=0.5))
+        self.assertGreaterEqual(delivered.result(timeout=5), 0)
+        delivery.stop()
+        metrics = delivery.metrics()
+        self.assertEqual((metrics["sent"], metrics["failed"], metrics["retries"]), (1, 1, 0))
+        self.assertEqual(server.connections, 1)
+        server.shutdown()
+        server.server_close()
+
+if __name__ == '__main__':
+    unittest.main()
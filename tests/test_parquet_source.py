@@ -0,0 +1,83 @@
+import unittest
+import io
+import sqlite3
+import tempfile
+from pathlib import Path
+from src.aggregation import analysis_to_dict
+from src.report_generator import ReportGenerator
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+if pyarrow is not None:
+    from src.parquet_source import ParquetDataSource
+    from src.data_sources import read_sales_chunks
+
+@unittest.skipUnless(pyarrow, "pyarrow is not installed")
+class TestParquetDataSource(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.report_generator = ReportGenerator(str(Path(self.tmp.name) / "config.json"))
+        self.conn = sqlite3.connect(":memory:")
+        self.report_generator.create_sample_data(self.conn, n_rows=20_000, seed=5)
+        self.source = ParquetDataSource(Path(self.tmp.name) / "store", mode="attach")
+        self.source.import_sqlite(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def assertSameAnalysis(self, first, second):
+        first, second = analysis_to_dict(first), analysis_to_dict(second)
+        for key in ("best_day", "worst_day", "total_orders"):
+            self.assertEqual(first[key], second[key])
+        self.assertAlmostEqual(first["total_sales"], second["total_sales"], places=2)
+        self.assertEqual(list(first["regional_performance"]), list(second["regional_performance"]))
+
+    def test_partitioned_layout_and_dictionary_columns(self):
+        self.assertEqual(len(list((self.source.path / "sales").glob("month=*"))), 12)
+        self.assertIn("customers", self.source.prepare())
+        schema = self.source.dataset("sales").schema
+        self.assertTrue(pyarrow.types.is_dictionary(schema.field("region").type))
+        frame = self.source.read_sales(["date", "region"], start_date="2024-02-01", end_date="2024-02-29")
+        self.assertEqual(list(frame.columns), ["date", "region"])
+        self.assertEqual(str(frame["region"].dtype), "category")
+        self.assertEqual(frame["date"].dt.month.unique().tolist(), [2])
+
+    def test_analysis_matches_sqlite(self):
+        analysis, daily = self.report_generator.generate_sales_analysis(self.source)
+        expected, _ = self.report_generator.generate_sales_analysis(self.conn, engine="sql")
+        self.assertSameAnalysis(analysis, expected)
+        self.assertEqual(len(daily), 366)
+        filters = ("2024-05-01", "2024-06-15", {"region": "North", "product_category": "Books"})
+        self.assertSameAnalysis(
+            self.report_generator.filtered_sales_analysis(self.source, *filters),
+            self.report_generator.filtered_sales_analysis(self.conn, *filters),
+        )
+        with self.assertRaises(ValueError):
+            self.report_generator.generate_sales_analysis(self.source, engine="sql")
+
+    def test_customer_analysis_matches_sqlite(self):
+        analysis = self.report_generator.generate_customer_analysis(self.source)
+        expected = self.report_generator.generate_customer_analysis(self.conn)
+        self.assertEqual(analysis["customer_count"], 1000)
+        self.assertEqual(analysis["cohorts"]["customers"].to_dict(), expected["cohorts"]["customers"].to_dict())
+        self.assertEqual(analysis["ltv_histogram"]["customers"].tolist(), expected["ltv_histogram"]["customers"].tolist())
+        self.assertAlmostEqual(analysis["ltv_percentiles"]["p50"], expected["ltv_percentiles"]["p50"], places=6)
+
+    def test_ingest_appends_new_files(self):
+        before = self.source.fingerprint()
+        csv = "date,sales_amount,orders,customers,product_category,region\n2025-01-02,5.5,1,1,Books,North\n"
+        stats = self.source.ingest(read_sales_chunks(io.StringIO(csv), "csv"))
+        self.assertEqual(stats["rows"], 1)
+        after = self.source.fingerprint()
+        self.assertEqual(after["rows"], before["rows"] + 1)
+        self.assertNotEqual(after["checksum"], before["checksum"])
+        with self.assertRaises(ValueError):
+            self.source.ingest(read_sales_chunks(io.StringIO(csv.replace("5.5", "n/a")), "csv"))
+        self.assertEqual(self.source.fingerprint(), after)
+
+if __name__ == '__main__':
+    unittest.main()
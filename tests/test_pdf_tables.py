@@ -0,0 +1,44 @@
+import unittest
+import tempfile
+from pathlib import Path
+from src.pdf_tables import FlowableStream, build_pdf, long_table, paragraph_styles, table_style
+
+class TestPdfTables(unittest.TestCase):
+    def test_long_table_chunks_rows_lazily(self):
+        consumed = []
+        def rows():
+            for index in range(250):
+                consumed.append(index)
+                yield (f"row {index}", index * 1.5, index)
+        tables = long_table(["Name", "Amount", "Count"], rows(), chunk_rows=100)
+        first = next(tables)
+        self.assertEqual(len(consumed), 100)
+        self.assertEqual(first._cellvalues[0], ["Name", "Amount", "Count"])
+        self.assertEqual(first._cellvalues[2], ["row 1", "1.50", "1"])
+        self.assertEqual(first.repeatRows, 1)
+        self.assertEqual([len(table._cellvalues) for table in tables], [101, 51])
+
+    def test_styles_are_cached(self):
+        self.assertIs(paragraph_styles(), paragraph_styles())
+        self.assertIs(table_style("long"), table_style("long"))
+        with self.assertRaises(ValueError):
+            table_style("fancy")
+
+    def test_flowable_stream_buffers_ahead(self):
+        source = iter(range(100))
+        stream = FlowableStream(source)
+        self.assertEqual(len(stream), 4)
+        self.assertEqual(stream[0], 0)
+        del stream[0]
+        self.assertEqual(next(source), 4)
+
+    def test_build_pdf_repeats_header_on_every_page(self):
+        rows = ((f"CUST_{index:05d}", float(index), index) for index in range(1000))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "long.pdf"
+            pages = build_pdf(path, long_table(["Customer", "Value", "Orders"], rows))
+            self.assertGreater(pages, 15)
+            self.assertTrue(path.read_bytes().startswith(b"%PDF"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 
 import unittest
 import os
+import re
+import sqlite3
+import tempfile
+from pathlib import Path
 from src.report_generator import ReportGenerator
 
 class TestReportGenerator(unittest.TestCase):
@@ -28,6 +32,114 @@ class TestReportGenerator(unittest.TestCase):
         self.assertGreater(analysis["total_sales"], 0)
         conn.close()
 
+    def test_create_sample_data_scale_and_seed(self):
+        conns = [sqlite3.connect(":memory:") for _ in range(2)]
+        for conn in conns:
+            self.report_generator.create_sample_data(conn, n_rows=5000, n_customers=300, seed=42, chunk_size=1000)
+        rows = [conn.execute("SELECT * FROM sales").fetchall() for conn in conns]
+        self.assertEqual(len(rows[0]), 5000)
+        self.assertEqual(rows[0], rows[1])
+        days = conns[0].execute("SELECT COUNT(DISTINCT date), MIN(date), MAX(date) FROM sales").fetchone()
+        self.assertEqual(days, (366, "2024-01-01", "2024-12-31"))
+        self.assertEqual(conns[0].execute("SELECT COUNT(*) FROM customers").fetchone(), (300,))
+        for conn in conns:
+            conn.close()
+
+    def test_render_artifacts_in_worker_processes(self):
+        conn = self.report_generator.connect_database(db_path=":memory:")
+        analysis, sales_df = self.report_generator.generate_sales_analysis(conn)
+        conn.close()
+        with tempfile.TemporaryDirectory() as tmp:
+            artifacts = self.report_generator.render_artifacts(sales_df, analysis, parallel=True, output_dir=tmp)
+            self.report_generator.close()
+            for key in ("charts", "dashboard", "pdf_report"):
+                self.assertTrue(os.path.exists(artifacts[key]))
+
+    def test_generate_batch_reports_from_one_scan(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.report_generator.output_dir = self.report_generator.state_dir = Path(tmp) / "reports"
+            self.report_generator.config["data_source"] = {"path": os.path.join(tmp, "sales.db")}
+            specs = [
+                {"name": "north", "title": "North Region Report", "segment": {"region": "North"}},
+                {"name": "books_west", "segment": {"product_category": "Books", "region": "West"}},
+                {"name": "nowhere", "segment": {"region": "Atlantis"}},
+            ]
+            results = self.report_generator.generate_batch_reports(specs, parallel=True)
+            self.report_generator.close()
+            self.assertEqual(set(results), {"north", "books_west"})
+            self.assertEqual(list(results["north"]["analysis"]["regional_performance"].index), ["North"])
+            for artifacts in results.values():
+                for key in ("charts", "dashboard", "pdf_report"):
+                    self.assertTrue(os.path.exists(artifacts[key]))
+            self.assertIn(os.path.join("reports", "north"), results["north"]["pdf_report"])
+            stages = [record["stage"] for record in results["north"]["metrics"]["stages"]]
+            self.assertEqual(stages.count("aggregate"), 1)
+            self.assertEqual(stages.count("pdf"), 2)
+            self.assertIn("dashboard", stages)
+
+    def test_interactive_dashboard_is_downsampled_and_shares_plotlyjs(self):
+        conn = sqlite3.connect(":memory:")
+        self.report_generator.create_sample_data(conn, start_date="2015-01-01", end_date="2024-12-31", seed=3)
+        analysis, sales_df = self.report_generator.generate_sales_analysis(conn)
+        conn.close()
+        with tempfile.TemporaryDirectory() as tmp:
+            options = {"max_points": 500, "webgl_threshold": 400}
+            path = self.report_generator.create_interactive_dashboard(sales_df, analysis, output_dir=tmp, options=options)
+            with open(path) as f:
+                html = f.read()
+            self.assertIn("scattergl", html)
+            self.assertIn('src="plotly.min.js"', html)
+            payload = self.report_generator.dashboard_payload(path)
+            self.assertLess(payload["html_bytes"], 100_000)
+            self.assertGreater(payload["plotlyjs_bytes"], payload["html_bytes"])
+
+    def test_render_profiles_and_panel_charts(self):
+        conn = self.report_generator.connect_database(db_path=":memory:")
+        analysis, sales_df = self.report_generator.generate_sales_analysis(conn)
+        conn.close()
+        self.report_generator.config["render"] = {"parallel": False, "profile": "draft", "panels": True}
+        with tempfile.TemporaryDirectory() as tmp:
+            artifacts = self.report_generator.render_artifacts(sales_df, analysis, output_dir=tmp)
+            self.assertEqual(sorted(k for k in artifacts if k.startswith("panel_")),
+                             ["panel_category", "panel_daily_trend", "panel_monthly", "panel_region"])
+            with open(artifacts["charts"], "rb") as f:
+                header = f.read(24)
+            width = int.from_bytes(header[16:20], "big")
+            self.assertEqual(width, 15 * 60)
+        with self.assertRaises(ValueError):
+            self.report_generator.render_profile("poster")
+
+    def test_pdf_detail_tables_span_pages(self):
+        def page_count(path):
+            with open(path, "rb") as f:
+                return len(re.findall(rb"/Type /Page\b(?!s)", f.read()))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.report_generator.config["data_source"] = {"path": os.path.join(tmp, "sales.db")}
+            with self.report_generator.get_data_source().connection() as conn:
+                analysis, sales_df = self.report_generator.generate_sales_analysis(conn)
+            chart_path = self.report_generator.create_visualizations(sales_df, analysis, output_dir=tmp)
+            pages = {}
+            for name, pdf_tables in (("none", []), ("daily", ["daily"]), ("both", ["daily", "customers"])):
+                self.report_generator.config["render"] = {"pdf_tables": pdf_tables, "pdf_chunk_rows": 100}
+                path = self.report_generator.generate_pdf_report(analysis, chart_path, output_dir=os.path.join(tmp, name),
+                                                                 sales_df=sales_df)
+                pages[name] = page_count(path)
+            self.report_generator.close()
+        self.assertGreater(pages["daily"], pages["none"] + 1)
+        self.assertGreater(pages["both"], pages["daily"] + 1)
+
+    def test_build_scheduler_from_report_templates(self):
+        from datetime import datetime
+        with tempfile.TemporaryDirectory() as tmp:
+            self.report_generator.config["scheduler"] = {"state_path": os.path.join(tmp, "state.json")}
+            self.report_generator.config["report_templates"]["financial_report"]["schedule"] = "0 18 L * *"
+            scheduler = self.report_generator.build_scheduler(clock=lambda: datetime(2024, 2, 1, 10, 0))
+            status = scheduler.status()
+            self.assertEqual(status["sales_report"]["next_due"], "2024-02-05T09:00:00")
+            self.assertEqual(status["financial_report"]["next_due"], "2024-02-29T18:00:00")
+            scheduler.stop()
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,97 @@
+import unittest
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from src.scheduler import CronExpression, Scheduler, parse_schedule
+
+class TestCronExpression(unittest.TestCase):
+    def test_next_fire_times(self):
+        moment = datetime(2024, 1, 31, 10, 30)
+        self.assertEqual(parse_schedule('weekly').next_after(moment), datetime(2024, 2, 5, 9, 0))
+        self.assertEqual(parse_schedule('monthly').next_after(moment), datetime(2024, 2, 1, 9, 0))
+        self.assertEqual(CronExpression('*/15 * * * *').next_after(moment), datetime(2024, 1, 31, 10, 45))
+        self.assertEqual(CronExpression('0 18 L * *').next_after(moment), datetime(2024, 1, 31, 18, 0))
+        self.assertEqual(CronExpression('0 18 L * *').next_after(datetime(2024, 1, 31, 18, 0)),
+                         datetime(2024, 2, 29, 18, 0))
+        self.assertEqual(CronExpression('@monthly').next_after(datetime(2024, 12, 15)), datetime(2025, 1, 1))
+        self.assertEqual(CronExpression('0 9 1 jan,jul *').next_after(moment), datetime(2024, 7, 1, 9, 0))
+        # A restricted day of month and day of week match either
+        self.assertEqual(CronExpression('0 0 15 * fri').next_after(moment), datetime(2024, 2, 2))
+
+    def test_invalid_expressions(self):
+        for expression in ('* * *', '61 * * * *', '0 0 * * funday', '0 0 30 2 *'):
+            with self.assertRaises(ValueError):
+                CronExpression(expression).next_after(datetime(2024, 1, 1))
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_path = Path(self.tmp.name) / 'state.json'
+        self.now = datetime(2024, 1, 1, 8, 0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def scheduler(self, **kwargs):
+        return Scheduler(self.state_path, clock=lambda: self.now, **kwargs)
+
+    def test_runs_due_jobs_and_persists_last_run(self):
+        runs = []
+        scheduler = self.scheduler()
+        scheduler.add_job('daily', '0 9 * * *', lambda: runs.append(1))
+        self.assertEqual(scheduler.next_due(), datetime(2024, 1, 1, 9, 0))
+        self.assertEqual(scheduler.run_pending(datetime(2024, 1, 1, 8, 59)), [])
+        self.assertEqual(scheduler.run_pending(datetime(2024, 1, 1, 9, 0)), [('daily', datetime(2024, 1, 1, 9, 0))])
+        scheduler.stop()
+        self.assertEqual(runs, [1])
+        self.assertEqual(scheduler.state.get('daily')['last_status'], 'succeeded')
+
+        # A restart neither repeats the completed run nor forgets a missed one
+        self.now = datetime(2024, 1, 4, 12, 0)
+        restarted = self.scheduler()
+        restarted.add_job('daily', '0 9 * * *', lambda: runs.append(2))
+        self.assertEqual(restarted.run_pending(), [('daily', datetime(2024, 1, 4, 9, 0))])
+        restarted.stop()
+        self.assertEqual(runs, [1, 2])
+        self.assertEqual(restarted.next_due(), datetime(2024, 1, 5, 9, 0))
+
+    def test_misfire_skip_outside_grace(self):
+        Scheduler(self.state_path).state.update('report', last_scheduled='2024-01-01T09:00:00')
+        self.now = datetime(2024, 1, 3, 12, 0)
+        scheduler = self.scheduler()
+        scheduler.add_job('report', '0 9 * * *', lambda: None, misfire='skip', misfire_grace=60)
+        self.assertEqual(scheduler.run_pending(), [])
+        self.assertEqual(scheduler.state.get('report')['last_status'], 'missed')
+        self.assertEqual(scheduler.next_due(), datetime(2024, 1, 4, 9, 0))
+        scheduler.stop()
+
+    def test_overlap_policies_and_failures(self):
+        release = threading.Event()
+        def slow():
+            release.wait(5)
+            raise RuntimeError("boom")
+        calls = []
+        def wait_for_calls(count):
+            deadline = time.monotonic() + 5
+            while len(calls) < count and time.monotonic() < deadline:
+                time.sleep(0.01)
+        scheduler = self.scheduler(max_workers=4)
+        scheduler.add_job('skipped', '* * * * *', lambda: (calls.append('skipped'), slow()))
+        scheduler.add_job('queued', '* * * * *', lambda: (calls.append('queued'), slow()), overlap='queue')
+        scheduler.run_pending(datetime(2024, 1, 1, 8, 1))
+        wait_for_calls(2)
+        scheduler.run_pending(datetime(2024, 1, 1, 8, 2))
+        self.assertEqual(sorted(calls), ['queued', 'skipped'])
+        release.set()
+        # The queued run starts once the first one finishes
+        wait_for_calls(3)
+        scheduler.stop()
+        self.assertEqual(sorted(calls), ['queued', 'queued', 'skipped'])
+        self.assertEqual(scheduler.state.get('skipped')['last_skipped'], '2024-01-01T08:02:00')
+        self.assertEqual(scheduler.state.get('queued')['last_scheduled'], '2024-01-01T08:02:00')
+        self.assertEqual(scheduler.state.get('queued')['last_status'], 'failed')
+
+if __name__ == '__main__':
+    unittest.main()